@@ -77,7 +77,7 @@ try {
         Write-Host "To view the full log, open: $LogFile" -ForegroundColor Cyan
         
         # Check if batch summary was created
-        $summaryFiles = Get-ChildItem -Path $OutputDir -Filter "batch_summary_*.json" | Sort-Object LastWriteTime -Descending
+        $summaryFiles = Get-ChildItem -Path $OutputDir -Filter "batch_summary_*.jsonl" | Sort-Object LastWriteTime -Descending
         if ($summaryFiles.Count -gt 0) {
             $latestSummary = $summaryFiles[0]
             Write-Host "Batch summary created: $($latestSummary.FullName)" -ForegroundColor Green
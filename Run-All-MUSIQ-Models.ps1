@@ -1,6 +1,7 @@
 # MUSIQ Multi-Model Drag-and-Drop Runner for Windows 11 + WSL2
 # Runs all available MUSIQ models on an image and saves results to JSON
 # Simply drag and drop an image file onto this script
+# Start 'python scoring_daemon.py' in WSL first to keep the models loaded between images
 
 param(
     [Parameter(ValueFromPipeline=$true)]
@@ -31,9 +32,11 @@ if (-not $ImagePaths -or $ImagePaths.Count -eq 0) {
     exit 1
 }
 
-# Process each dropped file
+# Collect the dropped files; all of them are scored in one invocation so
+# the models are loaded only once
+$WslPaths = @()
 foreach ($ImagePath in $ImagePaths) {
-    Write-Host "Processing: $ImagePath" -ForegroundColor Yellow
+    Write-Host "Adding: $ImagePath" -ForegroundColor Yellow
     
     # Check if file exists
     if (-not (Test-Path $ImagePath)) {
@@ -54,31 +57,35 @@ foreach ($ImagePath in $ImagePaths) {
     
     # Convert Windows path to WSL path
     $WslPath = $ImagePath -replace '^([A-Z]):', '/mnt/$($matches[1].ToLower())' -replace '\\', '/'
-    
-    Write-Host "WSL path: $WslPath" -ForegroundColor Cyan
+    $WslPaths += "'$WslPath'"
+}
+
+if ($WslPaths.Count -eq 0) {
+    Write-Host "No image files to process." -ForegroundColor Red
+    Read-Host "Press Enter to exit"
+    exit 1
+}
+
+Write-Host ""
+Write-Host "Starting MUSIQ multi-model inference on $($WslPaths.Count) image(s)..." -ForegroundColor Green
+Write-Host "========================================" -ForegroundColor Green
+
+# Run MUSIQ multi-model through WSL2, loading the models once for all images
+$Command = "source ~/.venvs/tf/bin/activate && cd /mnt/d/Projects/image-scoring && python run_all_musiq_models.py --image $($WslPaths -join ' ') --output-dir /mnt/d/Projects/image-scoring"
+
+try {
+    wsl bash -c $Command
     Write-Host ""
-    
-    Write-Host "Starting MUSIQ multi-model inference..." -ForegroundColor Green
     Write-Host "========================================" -ForegroundColor Green
-    
-    # Run MUSIQ multi-model through WSL2
-    $Command = "source ~/.venvs/tf/bin/activate && cd /mnt/d/Projects/image-scoring && python run_all_musiq_models.py --image '$WslPath' --output-dir /mnt/d/Projects/image-scoring"
-    
-    try {
-        wsl bash -c $Command
-        Write-Host ""
-        Write-Host "========================================" -ForegroundColor Green
-        Write-Host "Processing completed for: $ImagePath" -ForegroundColor Green
-        Write-Host "========================================" -ForegroundColor Green
-    }
-    catch {
-        Write-Host "ERROR: Failed to process $ImagePath" -ForegroundColor Red
-        Write-Host "Error: $($_.Exception.Message)" -ForegroundColor Red
-    }
-    
-    Write-Host ""
+    Write-Host "Processing completed for $($WslPaths.Count) image(s)" -ForegroundColor Green
+    Write-Host "========================================" -ForegroundColor Green
+}
+catch {
+    Write-Host "ERROR: Failed to process the images" -ForegroundColor Red
+    Write-Host "Error: $($_.Exception.Message)" -ForegroundColor Red
 }
 
+Write-Host ""
 Write-Host "All files processed!" -ForegroundColor Green
 Write-Host ""
 Write-Host "JSON results files have been saved in the source folder." -ForegroundColor Green
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+asyncio front-end for MultiModelMUSIQ.
+
+`await scorer.score(image_bytes)` runs the blocking TensorFlow calls of
+run_all_models on a dedicated thread pool, so an asyncio service (e.g. an
+upload handler) keeps its event loop responsive while many requests share
+one set of loaded models.
+
+A semaphore bounds how many images are scored at once; each request can
+have a timeout and can be cancelled. A signature call that already started
+cannot be interrupted: the caller gets its TimeoutError / CancelledError at
+once, and the concurrency slot is freed when the call actually finishes, so
+abandoned work never oversubscribes the runtime.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+from run_all_musiq_models import ImageInput, MultiModelMUSIQ
+
+
+class AsyncMUSIQScorer:
+    """Async scoring API over a loaded MultiModelMUSIQ with a concurrency limit and timeouts."""
+    
+    def __init__(self, scorer: MultiModelMUSIQ, max_concurrency: int = 4, timeout: Optional[float] = None):
+        self.scorer = scorer
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        self.timeouts = 0
+        self.cancellations = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="musiq-score")
+        # Created lazily, inside the running event loop
+        self._slots = None
+    
+    async def score(self, image: Union[bytes, str, ImageInput], models: Optional[List[str]] = None,
+                    timeout: Optional[float] = None, name: Optional[str] = None) -> Dict[str, any]:
+        """Score one image (encoded bytes, a path, or an ImageInput) and return its results dict.
+        
+        Waits for a free slot first; `timeout` (default: the scorer's) covers
+        the wait and the scoring. Raises asyncio.TimeoutError on timeout.
+        """
+        if isinstance(image, (bytes, bytearray)):
+            image = ImageInput(bytes(image), name or "upload")
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._score(image, models), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancellations += 1
+            raise
+    
+    async def _score(self, image: Union[str, ImageInput], models: Optional[List[str]]) -> Dict[str, any]:
+        """Acquire a slot and run run_all_models on the executor."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        await self._slots.acquire()
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._run, image, models)
+        future.add_done_callback(self._release)
+        # Shielded: a timeout or cancellation abandons the result but leaves the
+        # running call (and its slot) alone until it finishes
+        return await asyncio.shield(future)
+    
+    def _run(self, image: Union[str, ImageInput], models: Optional[List[str]]) -> Dict[str, any]:
+        """Blocking scoring call, run on an executor thread."""
+        return self.scorer.run_all_models(image, models=models, quiet=True)
+    
+    def _release(self, future: asyncio.Future):
+        """Free the slot of a finished call (and retrieve the error of an abandoned one)."""
+        self.in_flight -= 1
+        self._slots.release()
+        if not future.cancelled():
+            future.exception()
+    
+    async def close(self):
+        """Wait for running calls and shut the executor down."""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+    
+    async def __aenter__(self) -> "AsyncMUSIQScorer":
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def _score_files(async_scorer: AsyncMUSIQScorer, image_paths: List[str]):
+    """Score files concurrently and print one line per image as it finishes."""
+    async def score_file(image_path: str):
+        start = time.perf_counter()
+        try:
+            results = await async_scorer.score(image_path)
+            score = results["summary"].get("advanced_scoring", {}).get("final_robust_score")
+            print(f"{image_path}: final robust score {score} ({time.perf_counter() - start:.2f}s)")
+        except asyncio.TimeoutError:
+            print(f"{image_path}: timed out after {time.perf_counter() - start:.2f}s")
+    
+    async with async_scorer:
+        await asyncio.gather(*(score_file(image_path) for image_path in image_paths))
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Score images concurrently through the asyncio front-end",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python async_scorer.py sample1.jpg sample2.jpg sample3.jpg --concurrency 2
+  python async_scorer.py *.jpg --models spaq koniq --timeout 30
+
+Library use:
+  async with AsyncMUSIQScorer(scorer, max_concurrency=4, timeout=30) as async_scorer:
+      results = await async_scorer.score(uploaded_bytes)
+        """
+    )
+    
+    parser.add_argument('images', nargs='+', help='Image paths')
+    parser.add_argument('--models', nargs='+',
+                       choices=['spaq', 'ava', 'koniq', 'paq2piq', 'vila'],
+                       help='Models to load (default: all models)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Images scored at once (default: 4)')
+    parser.add_argument('--timeout', type=float, help='Per-image timeout in seconds (default: none)')
+    parser.add_argument('--offline', action='store_true',
+                       help='Do not contact TF Hub or Kaggle Hub; load cached artifacts or local checkpoints only')
+    parser.add_argument('--prefer-local', action='store_true',
+                       help='Try local checkpoints first (.npz checkpoints run natively with JAX)')
+    
+    args = parser.parse_args()
+    
+    missing = [image_path for image_path in args.images if not os.path.exists(image_path)]
+    if missing:
+        print(f"Error: Image file not found: {', '.join(missing)}")
+        sys.exit(1)
+    
+    scorer = MultiModelMUSIQ(offline=args.offline, prefer_local=args.prefer_local)
+    if not any(scorer.load_all_models(args.models).values()):
+        print("Error: No models loaded successfully")
+        sys.exit(1)
+    
+    async_scorer = AsyncMUSIQScorer(scorer, max_concurrency=args.concurrency, timeout=args.timeout)
+    asyncio.run(_score_files(async_scorer, args.images))
+
+
+if __name__ == "__main__":
+    main()
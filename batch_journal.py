@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Write-ahead journal for resumable batch runs.
+
+Every image is recorded as claimed before it is processed and as completed
+(success or skipped) or failed once its results are safely on disk. A killed
+run can then be resumed by replaying the journal: completed images are left
+out without opening their result files, and claimed or failed ones are
+processed again.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Set
+
+
+class BatchJournal:
+    """Append-only JSONL journal of claimed, completed and failed images."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stream = None
+    
+    def replay(self) -> Dict[str, str]:
+        """Return the last recorded state of every image: 'claimed', 'success', 'skipped' or 'failed'."""
+        states = {}
+        if not os.path.exists(self.path):
+            return states
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A record cut short by the crash; the image stays claimed
+                    continue
+                if "image" in record:
+                    states[record["image"]] = record["state"]
+        return states
+    
+    def completed(self) -> Set[str]:
+        """Return the images whose results were written (or were already current) in an earlier run."""
+        return {image for image, state in self.replay().items() if state in ("success", "skipped")}
+    
+    def open(self, resume: bool = False, **run_info):
+        """Open the journal for writing; a new run truncates it, a resumed run appends."""
+        self._stream = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self._write({"run": "resume" if resume else "start", "time": datetime.now().isoformat(), **run_info})
+    
+    def close(self):
+        """Close the journal."""
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+    
+    def claim(self, image_path: str):
+        """Record that processing of an image has started."""
+        self._write({"image": image_path, "state": "claimed"})
+    
+    def complete(self, image_path: str, status: str):
+        """Record that an image's results are on disk ('success') or were already current ('skipped')."""
+        self._write({"image": image_path, "state": status})
+    
+    def fail(self, image_path: str, error: str):
+        """Record that an image failed; a resumed run retries it."""
+        self._write({"image": image_path, "state": "failed", "error": error})
+    
+    def _write(self, record: dict):
+        """Append one record and hand it to the OS, so it survives the process being killed."""
+        with self._lock:
+            if self._stream is None:
+                return
+            self._stream.write(json.dumps(record) + '\n')
+            self._stream.flush()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Buffered, levelled logger for batch runs, with an optional JSONL event stream.
+
+Log lines are collected in memory and written to the console and log file
+together, at most every `flush_interval` seconds (warnings and errors are
+flushed at once), instead of opening the log file and printing for every
+message. Per-image detail can be written as one JSON record per line to a
+separate event file for later analysis.
+"""
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+class BatchLogger:
+    """Buffered log file + console output with levels and an optional JSONL event stream."""
+    
+    def __init__(self, log_file: str, level: str = "DEBUG", console_level: Optional[str] = None,
+                 events_file: Optional[str] = None, flush_interval: float = 1.0):
+        self.log_file = log_file
+        self.level = LEVELS[level]
+        self.console_level = LEVELS[console_level or level]
+        self.events_file = events_file
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file_lines = []
+        self._console_lines = []
+        self._events = []
+        self._last_flush = time.monotonic()
+    
+    def log(self, message: str, level: str = "INFO"):
+        """Queue a log line; flush if it is a warning or error or the interval has passed."""
+        severity = LEVELS.get(level, LEVELS["INFO"])
+        if severity < self.level and severity < self.console_level:
+            return
+        
+        log_entry = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{level}] {message}"
+        with self._lock:
+            if severity >= self.level:
+                self._file_lines.append(log_entry + '\n')
+            if severity >= self.console_level:
+                self._console_lines.append(log_entry + '\n')
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        
+        if severity >= LEVELS["WARNING"] or due:
+            self.flush()
+    
+    def event(self, event_type: str, **fields):
+        """Queue one JSONL event record (ignored without an event file)."""
+        if not self.events_file:
+            return
+        record = {"time": datetime.now().isoformat(), "event": event_type}
+        record.update(fields)
+        with self._lock:
+            self._events.append(json.dumps(record) + '\n')
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+    
+    def flush(self):
+        """Write all queued lines and events."""
+        with self._lock:
+            file_lines, self._file_lines = self._file_lines, []
+            console_lines, self._console_lines = self._console_lines, []
+            events, self._events = self._events, []
+            self._last_flush = time.monotonic()
+            
+            # One write per file, so whole lines from several worker
+            # processes appending to the same files do not interleave
+            if file_lines:
+                with open(self.log_file, 'ab', buffering=0) as f:
+                    f.write(''.join(file_lines).encode('utf-8'))
+            if events:
+                with open(self.events_file, 'ab', buffering=0) as f:
+                    f.write(''.join(events).encode('utf-8'))
+            if console_lines:
+                sys.stdout.write(''.join(console_lines))
+                sys.stdout.flush()
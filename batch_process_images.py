@@ -6,21 +6,107 @@ Redirects all output to a log file with current date in the filename.
 
 import argparse
 import json
+import multiprocessing
 import os
+import queue
 import sys
-import glob
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 
 # Import our multi-model MUSIQ class
-from run_all_musiq_models import MultiModelMUSIQ
+from batch_journal import BatchJournal
+from batch_logger import LEVELS, BatchLogger
+from image_scanner import ImageScanner
+from result_store import ResultStore
+from run_all_musiq_models import ImageInput, MultiModelMUSIQ
+from score_cache import DEFAULT_MAX_ENTRIES, ScoreCache
+
+
+# Default journal file name, in the output directory
+JOURNAL_FILE = "musiq_batch_journal.jsonl"
+
+# Per-process state for --workers mode: each worker process loads its models
+# once in _init_worker and keeps them for every image it is handed.
+_worker_state = {}
+
+
+def split_cpus(workers: int) -> List[List[int]]:
+    """Split the CPUs available to this process into one contiguous set per worker."""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cpus) // workers)
+    return [cpus[i * per_worker:(i + 1) * per_worker] or cpus for i in range(workers)]
+
+
+def _init_worker(log_file: str, output_dir: str, intra_op_threads: int,
+                 cpu_sets: Optional[List[List[int]]], worker_counter, worker_options: dict):
+    """Pool initializer: pin the worker, configure threading and load models once."""
+    with worker_counter.get_lock():
+        worker_id = worker_counter.value
+        worker_counter.value += 1
+    
+    if cpu_sets and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpu_sets[worker_id % len(cpu_sets)])
+    
+    # Each worker opens its own connections; SQLite WAL handles concurrent writers
+    result_store = None
+    if worker_options.get("result_store"):
+        result_store = ResultStore(worker_options["result_store"], worker_options["input_dir"])
+    processor = BatchImageProcessor(log_file, output_dir, result_store,
+                                    score_cache_path=worker_options.get("score_cache"),
+                                    score_cache_size=worker_options.get("score_cache_size"),
+                                    log_level=worker_options.get("log_level", "DEBUG"),
+                                    quiet=worker_options.get("quiet", False),
+                                    offline=worker_options.get("offline", False),
+                                    prefer_local=worker_options.get("prefer_local", False),
+                                    lazy_load=worker_options.get("lazy_load", False),
+                                    parallel_models=worker_options.get("parallel_models", False))
+    processor.worker_id = worker_id
+    _worker_state["processor"] = processor
+    _worker_state["output_dir"] = output_dir
+    _worker_state["load_error"] = None
+    
+    try:
+        scorer = processor.create_scorer(intra_op_threads)
+        successful_loads = processor.load_models(scorer)
+        processor.log(f"Intra-op threads: {intra_op_threads}")
+        if successful_loads == 0:
+            _worker_state["load_error"] = f"No models loaded successfully in worker {worker_id}"
+        _worker_state["scorer"] = scorer
+    except Exception as e:
+        # Raising from a pool initializer makes the pool respawn workers
+        # forever, so report the failure per image instead.
+        _worker_state["load_error"] = f"Failed to initialize MUSIQ models in worker {worker_id}: {e}"
+    try:
+        processor.logger.flush()
+    except OSError as e:
+        _worker_state["load_error"] = f"Failed to write log file {processor.log_file} in worker {worker_id}: {e}"
+
+
+def _process_in_worker(image_path: str) -> dict:
+    """Score one image with the models resident in this worker process."""
+    processor = _worker_state["processor"]
+    if _worker_state["load_error"]:
+        result = processor.failure_summary(image_path, RuntimeError(_worker_state["load_error"]))
+    else:
+        result = processor.process_single_image(image_path, _worker_state["scorer"], _worker_state["output_dir"])
+    # Pool workers are terminated without cleanup, so flush after every image
+    processor.logger.flush()
+    return result
 
 
 class BatchImageProcessor:
     """Batch process images with comprehensive logging."""
     
-    def __init__(self, log_file: str = None, output_dir: str = None):
+    def __init__(self, log_file: str = None, output_dir: str = None, result_store: Optional[ResultStore] = None,
+                 score_cache_path: Optional[str] = None, score_cache_size: Optional[int] = None,
+                 scan_manifest: Optional[str] = None, full_rescan: bool = False,
+                 log_level: str = "DEBUG", quiet: bool = False, events_file: Optional[str] = None,
+                 journal_path: Optional[str] = None, offline: bool = False, lazy_load: bool = False,
+                 prefer_local: bool = False, parallel_models: bool = False):
         if log_file is None:
             log_file = f"musiq_batch_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
         
@@ -34,122 +120,494 @@ class BatchImageProcessor:
         self.processed_count = 0
         self.failed_count = 0
         self.skipped_count = 0
-        self.results = []
+        self.worker_id = None
         
-    def log(self, message: str, level: str = "INFO"):
-        """Log a message with timestamp."""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = f"[{timestamp}] [{level}] {message}"
+        # Per-image summaries are streamed to a JSONL batch summary as images
+        # finish; only running aggregates are kept in memory
+        self.summary_file = None
+        self._summary_stream = None
+        self.score_total = 0.0
+        self.score_count = 0
+        self.best_image = None
+        self.worst_image = None
+        
+        # Write-ahead journal of claimed / completed / failed images, kept by
+        # the main process (default: JOURNAL_FILE in the output directory)
+        self.journal_path = journal_path
+        self.journal = None
+        
+        # Buffered log output; per-image lines are DEBUG, so --quiet leaves
+        # about one INFO record per image in the log file and none on the console
+        self.quiet = quiet
+        if quiet and LEVELS[log_level] < LEVELS["INFO"]:
+            log_level = "INFO"
+        self.log_level = log_level
+        self.logger = BatchLogger(log_file, level=log_level, console_level="WARNING" if quiet else log_level,
+                                  events_file=events_file)
         
-        # Print to console
-        print(log_entry)
+        # Optional SQLite result store; when set, results are keyed by relative
+        # path in the store instead of being written as <stem>.json files
+        self.result_store = result_store
         
-        # Write to log file
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry + '\n')
+        # Load models from cached artifacts / local checkpoints only (or local
+        # checkpoints first), and optionally only when first needed
+        self.offline = offline
+        self.prefer_local = prefer_local
+        self.lazy_load = lazy_load
+        
+        # Run the models of each image concurrently within a scorer
+        self.parallel_models = parallel_models
+        
+        # Optional content-hash score cache shared by every scorer this
+        # processor creates (one connection per process)
+        self.score_cache_path = score_cache_path
+        self.score_cache_size = score_cache_size or DEFAULT_MAX_ENTRIES
+        self.score_cache = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Directory scanner; with a manifest only new or changed images are
+        # returned by find_images and the manifest is saved when the run ends.
+        # The manifest is keyed on the version tags, so bumping one rescans
+        # every image (check_existing then rescores only the stale results)
+        scan_key = json.dumps({"models": MultiModelMUSIQ.MODEL_VERSIONS,
+                               "preprocessing": MultiModelMUSIQ.PREPROCESSING_VERSION,
+                               "aggregation": MultiModelMUSIQ.AGGREGATION_VERSION}, sort_keys=True)
+        self.scanner = ImageScanner(scan_manifest, full_rescan=full_rescan, key=scan_key)
     
-    def find_images(self, directory: str) -> List[str]:
-        """Find all image files in the specified directory."""
-        image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff', '*.tif']
-        image_files = []
+    def create_scorer(self, intra_op_threads: Optional[int] = None) -> MultiModelMUSIQ:
+        """Create a MultiModelMUSIQ scorer, attaching the score cache if configured."""
+        scorer = MultiModelMUSIQ(intra_op_threads=intra_op_threads, offline=self.offline,
+                                 prefer_local=self.prefer_local, parallel_models=self.parallel_models)
+        scorer.verbose = not self.quiet
+        if self.score_cache_path:
+            self.score_cache = ScoreCache(self.score_cache_path, self.score_cache_size)
+            scorer.score_cache = self.score_cache
+        return scorer
+    
+    def load_models(self, scorer: MultiModelMUSIQ) -> int:
+        """Load the scorer's models (concurrently, or lazily on first use); returns the number available."""
+        if self.lazy_load:
+            scorer.defer_models()
+            self.log(f"Lazy loading: {len(scorer.pending_models)} models will be loaded when first needed")
+            return len(scorer.pending_models)
         
-        for ext in image_extensions:
-            pattern = os.path.join(directory, ext)
-            image_files.extend(glob.glob(pattern))
-            # Also check subdirectories
-            pattern = os.path.join(directory, '**', ext)
-            image_files.extend(glob.glob(pattern, recursive=True))
+        load_results = scorer.load_all_models()
+        successful_loads = sum(1 for success in load_results.values() if success)
+        load_times = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in scorer.load_seconds.items())
+        self.log(f"Loaded {successful_loads}/{len(load_results)} models successfully ({load_times})")
+        return successful_loads
+    
+    def log(self, message: str, level: str = "INFO"):
+        """Log a message with timestamp (buffered, see BatchLogger)."""
+        if self.worker_id is not None:
+            message = f"[worker {self.worker_id}] {message}"
+        self.logger.log(message, level)
+    
+    def find_images(self, directory: str) -> List[str]:
+        """Find all image files in the specified directory and its subdirectories.
         
-        return sorted(list(set(image_files)))  # Remove duplicates and sort
+        With a scan manifest only images that are new or changed since the
+        last run, or that had a failed or missing model, are returned.
+        """
+        return self.scanner.scan(directory, only_changed=self.scanner.manifest_path is not None)
     
-    def process_single_image(self, image_path: str, scorer: MultiModelMUSIQ, output_dir: str) -> dict:
-        """Process a single image and return results."""
+    def check_existing(self, image_path: str, scorer: MultiModelMUSIQ, output_dir: str) -> Tuple[Optional[dict], Optional[dict]]:
+        """Look up earlier results for an image.
+        
+        Returns (skipped summary, None) when the earlier results are current,
+        (None, earlier results) when some models or the aggregate scores need
+        redoing, and (None, None) when the image has not been processed.
+        """
+        if self.result_store is not None:
+            return self._check_stored(image_path, scorer)
+        
+        existing = scorer.load_existing_results(image_path, output_dir)
+        if existing is None:
+            return None, None
+        
         try:
-            self.log(f"Processing: {image_path}")
-            
-            # Check if already processed with current version
-            if scorer.is_already_processed(image_path, output_dir):
-                self.log(f"Skipping {image_path} - already processed with version {scorer.VERSION}")
-                
-                # Load existing results for summary
-                image_name = os.path.splitext(os.path.basename(image_path))[0]
-                json_path = os.path.join(output_dir, f"{image_name}.json")
-                
-                try:
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                    
-                    # Extract key metrics from existing data
-                    summary = {
-                        "image_path": image_path,
-                        "image_name": image_name,
-                        "json_path": json_path,
-                        "status": "skipped",
-                        "models_successful": existing_data["summary"]["successful_predictions"],
-                        "models_failed": existing_data["summary"]["failed_predictions"],
-                        "average_normalized_score": existing_data["summary"]["average_normalized_score"],
-                        "individual_scores": {},
-                        "version": existing_data.get("version", "unknown")
-                    }
-                    
-                    # Add individual model scores
-                    for model_name, model_result in existing_data["models"].items():
-                        if model_result["status"] == "success":
-                            summary["individual_scores"][model_name] = {
-                                "score": model_result["score"],
-                                "normalized_score": model_result["normalized_score"]
-                            }
-                    
-                    self.log(f"Skipped: {image_path} - Version: {summary['version']} - Average Score: {summary['average_normalized_score']}")
-                    return summary
-                    
-                except Exception as e:
-                    self.log(f"Error loading existing results for {image_path}: {e}", "WARNING")
-                    # Fall through to reprocess
+            if not scorer.is_current(existing):
+                models_to_run = scorer.plan_update(existing)[0]
+                if models_to_run:
+                    self.log(f"Re-running {', '.join(models_to_run)} for {image_path}", "DEBUG")
+                else:
+                    self.log(f"Recomputing aggregate scores for {image_path}", "DEBUG")
+                return None, existing
             
-            # Run all models on the image
-            results = scorer.run_all_models(image_path)
+            image_name = os.path.splitext(os.path.basename(image_path))[0]
             
-            # Save results to JSON
-            image_name = Path(image_path).stem
-            json_path = os.path.join(output_dir, f"{image_name}.json")
-            scorer.save_results(results, json_path)
-            
-            # Extract key metrics
+            # Extract key metrics from existing data
             summary = {
                 "image_path": image_path,
                 "image_name": image_name,
-                "json_path": json_path,
-                "status": "success",
-                "models_successful": results["summary"]["successful_predictions"],
-                "models_failed": results["summary"]["failed_predictions"],
-                "average_normalized_score": results["summary"]["average_normalized_score"],
-                "individual_scores": {}
+                "json_path": os.path.join(output_dir, f"{image_name}.json"),
+                "status": "skipped",
+                "models_successful": existing["summary"]["successful_predictions"],
+                "models_failed": existing["summary"]["failed_predictions"],
+                "average_normalized_score": existing["summary"]["average_normalized_score"],
+                "individual_scores": {},
+                "version": existing.get("version", "unknown")
             }
             
             # Add individual model scores
-            for model_name, model_result in results["models"].items():
+            for model_name, model_result in existing["models"].items():
                 if model_result["status"] == "success":
                     summary["individual_scores"][model_name] = {
                         "score": model_result["score"],
                         "normalized_score": model_result["normalized_score"]
                     }
             
+            self.log(f"Skipped: {image_path} - Version: {summary['version']} - Average Score: {summary['average_normalized_score']}")
+            return summary, None
+        
+        except Exception as e:
+            self.log(f"Error loading existing results for {image_path}: {e}", "WARNING")
+            # Fall through to reprocess
+            return None, None
+    
+    def _check_stored(self, image_path: str, scorer: MultiModelMUSIQ) -> Tuple[Optional[dict], Optional[dict]]:
+        """check_existing against the result store: indexed lookups, stored results decoded only when stale."""
+        rel_path = self.result_store.relative_path(image_path)
+        info = self.result_store.get_version_info(rel_path)
+        if info is None:
+            return None, None
+        if not scorer.is_current(info):
+            return None, self.result_store.get_results(rel_path)
+        
+        summary = {
+            "image_path": image_path,
+            "json_path": None,
+            "result_key": rel_path,
+            "status": "skipped",
+        }
+        summary.update(self.result_store.get_summary(rel_path))
+        self.log(f"Skipped: {image_path} - Version: {summary['version']} - Average Score: {summary['average_normalized_score']}")
+        return summary, None
+    
+    def results_path(self, image_path: str, output_dir: str) -> Optional[str]:
+        """Return the JSON path results are written to, or None when using the result store."""
+        if self.result_store is not None:
+            return None
+        return os.path.join(output_dir, f"{Path(image_path).stem}.json")
+    
+    def write_results(self, image_path: str, results: dict, scorer: MultiModelMUSIQ, json_path: Optional[str]):
+        """Persist the results of one image to the result store or its JSON file."""
+        if self.result_store is not None:
+            self.result_store.put_results(self.result_store.relative_path(image_path), results)
+        elif not scorer.save_results(results, json_path):
+            raise OSError(f"Could not save results to {json_path}")
+    
+    def build_summary(self, image_path: str, json_path: str, results: dict) -> dict:
+        """Extract the batch summary entry from a full results dict."""
+        summary = {
+            "image_path": image_path,
+            "image_name": Path(image_path).stem,
+            "json_path": json_path,
+            "status": "success",
+            "models_successful": results["summary"]["successful_predictions"],
+            "models_failed": results["summary"]["failed_predictions"],
+            "average_normalized_score": results["summary"]["average_normalized_score"],
+            "individual_scores": {}
+        }
+        if self.result_store is not None:
+            summary["result_key"] = self.result_store.relative_path(image_path)
+        if "cache_hits" in results["summary"]:
+            summary["cache_hits"] = results["summary"]["cache_hits"]
+            summary["cache_misses"] = results["summary"]["cache_misses"]
+        if "timing" in results:
+            summary["timing"] = results["timing"]
+        
+        # Add individual model scores
+        for model_name, model_result in results["models"].items():
+            if model_result["status"] == "success":
+                summary["individual_scores"][model_name] = {
+                    "score": model_result["score"],
+                    "normalized_score": model_result["normalized_score"]
+                }
+                if "inference_seconds" in model_result:
+                    summary["individual_scores"][model_name]["inference_seconds"] = model_result["inference_seconds"]
+                if model_result.get("cached"):
+                    summary["individual_scores"][model_name]["cached"] = True
+        
+        return summary
+    
+    def failure_summary(self, image_path: str, error: Exception) -> dict:
+        """Log a processing failure and return its summary entry."""
+        self.log(f"Failed to process {image_path}: {str(error)}", "ERROR")
+        return {
+            "image_path": image_path,
+            "image_name": Path(image_path).stem,
+            "status": "failed",
+            "error": str(error)
+        }
+    
+    def process_single_image(self, image_path: str, scorer: MultiModelMUSIQ, output_dir: str) -> dict:
+        """Process a single image and return results."""
+        try:
+            self.log(f"Processing: {image_path}", "DEBUG")
+            
+            # Check if already processed with current versions
+            summary, existing = self.check_existing(image_path, scorer, output_dir)
+            if summary is not None:
+                return summary
+            
+            # Run all models on the image (only stale models when results exist)
+            results = scorer.run_all_models(image_path, existing=existing)
+            
+            # Save results to JSON (or the result store)
+            json_path = self.results_path(image_path, output_dir)
+            self.write_results(image_path, results, scorer, json_path)
+            
+            summary = self.build_summary(image_path, json_path, results)
             self.log(f"Completed: {image_path} - Average Score: {summary['average_normalized_score']}")
             return summary
-            
+        
         except Exception as e:
-            error_msg = f"Failed to process {image_path}: {str(e)}"
-            self.log(error_msg, "ERROR")
-            return {
-                "image_path": image_path,
-                "image_name": Path(image_path).stem,
-                "status": "failed",
-                "error": str(e)
-            }
+            return self.failure_summary(image_path, e)
+    
+    def _read_stage(self, image_path: str, scorer: MultiModelMUSIQ, output_dir: str):
+        """Reader stage: skip check and image read, run on the reader pool.
+        
+        Returns (skipped summary or None, ImageInput or None, earlier results
+        or None). The image is not read when only the aggregate scores need
+        recomputing, and a failed read yields no ImageInput so the inference
+        stage reports the error exactly as a sequential run would.
+        """
+        summary, existing = self.check_existing(image_path, scorer, output_dir)
+        if summary is not None:
+            return summary, None, None
+        if existing is not None and not scorer.plan_update(existing)[0]:
+            return None, None, existing
+        try:
+            return None, ImageInput.from_path(image_path), existing
+        except OSError:
+            return None, None, existing
     
-    def process_directory(self, input_dir: str, output_dir: str = None):
-        """Process all images in a directory."""
+    def _writer_stage(self, scorer: MultiModelMUSIQ, write_queue: "queue.Queue"):
+        """Writer stage: save results until a None sentinel arrives, reporting each save through its future."""
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+            image_path, results, json_path, saved = item
+            try:
+                self.write_results(image_path, results, scorer, json_path)
+            except Exception as e:
+                saved.set_exception(e)
+            else:
+                saved.set_result(json_path)
+    
+    def _record_saved(self, pending: deque, wait: bool = False):
+        """Record pending summaries in input order once their results are saved.
+        
+        Stops at the first image whose save is still running unless `wait`.
+        An image whose save failed is recorded as failed, as in a sequential run.
+        """
+        while pending and (wait or pending[0][1] is None or pending[0][1].done()):
+            summary, saved = pending.popleft()
+            if saved is not None and saved.exception() is not None:
+                summary = self.failure_summary(summary["image_path"], saved.exception())
+            self.record_result(summary)
+    
+    def process_images_pipelined(self, image_files: List[str], scorer: MultiModelMUSIQ, output_dir: str,
+                                 prefetch: int, writer_threads: int = 1):
+        """Process images with overlapping read, inference and write stages.
+        
+        A reader thread pool prefetches image bytes (and does the skip check)
+        up to `prefetch` images ahead, inference runs on the calling thread,
+        and `writer_threads` threads save the JSON files. The stages are joined
+        by bounded queues and results are consumed in input order, so the
+        output is the same as a sequential run. An image is recorded only
+        after its results are saved.
+        """
+        read_queue = queue.Queue(maxsize=prefetch)
+        write_queue = queue.Queue(maxsize=prefetch)
+        
+        writers = [
+            threading.Thread(target=self._writer_stage, args=(scorer, write_queue), daemon=True)
+            for _ in range(max(1, writer_threads))
+        ]
+        for writer in writers:
+            writer.start()
+        
+        with ThreadPoolExecutor(max_workers=prefetch) as reader_pool:
+            def feed():
+                # Futures are queued in input order; the bounded queue limits
+                # how far reads run ahead of inference.
+                for image_path in image_files:
+                    read_queue.put((image_path, reader_pool.submit(self._read_stage, image_path, scorer, output_dir)))
+                read_queue.put(None)
+            
+            feeder = threading.Thread(target=feed, daemon=True)
+            feeder.start()
+            
+            # (summary, save future or None) of images not recorded yet, in input order
+            pending = deque()
+            i = 0
+            while True:
+                item = read_queue.get()
+                if item is None:
+                    break
+                image_path, future = item
+                i += 1
+                self.log(f"Progress: {i}/{len(image_files)}", "DEBUG")
+                self.log(f"Processing: {image_path}", "DEBUG")
+                self.claim(image_path)
+                
+                saved = None
+                try:
+                    summary, image_input, existing = future.result()
+                    if summary is None:
+                        results = scorer.run_all_models(image_input if image_input is not None else image_path,
+                                                        existing=existing)
+                        json_path = self.results_path(image_path, output_dir)
+                        saved = Future()
+                        write_queue.put((image_path, results, json_path, saved))
+                        summary = self.build_summary(image_path, json_path, results)
+                        self.log(f"Completed: {image_path} - Average Score: {summary['average_normalized_score']}")
+                except Exception as e:
+                    summary = self.failure_summary(image_path, e)
+                
+                pending.append((summary, saved))
+                self._record_saved(pending)
+                self.log("-" * 40, "DEBUG")
+            
+            feeder.join()
+        
+        for _ in writers:
+            write_queue.put(None)
+        for writer in writers:
+            writer.join()
+        self._record_saved(pending, wait=True)
+    
+    def process_images_multiprocess(self, image_files: List[str], output_dir: str, workers: int,
+                                    intra_op_threads: Optional[int] = None, cpu_affinity: bool = False,
+                                    input_dir: Optional[str] = None):
+        """Score images in `workers` processes that each keep their own models loaded.
+        
+        Images are handed out one at a time from the pool's shared task queue
+        and the summaries come back in input order, so per-image JSON and the
+        batch summary match a single-process run.
+        """
+        cpu_sets = split_cpus(workers)
+        if intra_op_threads is None:
+            intra_op_threads = len(cpu_sets[0])
+        
+        self.log(f"Starting {workers} worker processes (intra-op threads per worker: {intra_op_threads}, "
+                 f"CPU affinity: {'on' if cpu_affinity else 'off'})")
+        
+        # Spawn rather than fork: TensorFlow runtime state does not survive fork
+        context = multiprocessing.get_context("spawn")
+        worker_counter = context.Value('i', 0)
+        with context.Pool(
+                processes=workers,
+                initializer=_init_worker,
+                # Absolute, so workers do not join output_dir onto it a second time
+                initargs=(os.path.abspath(self.log_file), output_dir, intra_op_threads,
+                          cpu_sets if cpu_affinity else None, worker_counter,
+                          {"result_store": self.result_store.db_path if self.result_store else None,
+                           "input_dir": input_dir,
+                           "score_cache": self.score_cache_path,
+                           "score_cache_size": self.score_cache_size,
+                           "log_level": self.log_level,
+                           "quiet": self.quiet,
+                           "offline": self.offline,
+                           "prefer_local": self.prefer_local,
+                           "lazy_load": self.lazy_load,
+                           "parallel_models": self.parallel_models})) as pool:
+            for i, result in enumerate(pool.imap(_process_in_worker, self._claimed(image_files), chunksize=1), 1):
+                self.log(f"Progress: {i}/{len(image_files)}", "DEBUG")
+                self.record_result(result)
+    
+    def _claimed(self, image_files: List[str]):
+        """Yield the images, journaling each as claimed when it is handed to a worker."""
+        for image_path in image_files:
+            self.claim(image_path)
+            yield image_path
+    
+    def claim(self, image_path: str):
+        """Journal that an image is about to be processed."""
+        if self.journal is not None:
+            self.journal.claim(image_path)
+    
+    def journal_result(self, image_path: str, status: str, error: Optional[str] = None):
+        """Journal the outcome of an image whose results (if any) are on disk."""
+        if self.journal is None:
+            return
+        if status == "failed":
+            self.journal.fail(image_path, error or "")
+        else:
+            self.journal.complete(image_path, status)
+    
+    def open_summary(self, input_dir: str, output_dir: str, image_files: List[str]):
+        """Start the JSONL batch summary with a header record.
+        
+        One record per image follows as each image finishes and a footer with
+        the overall statistics is added by log_completion, so a run that
+        crashes still leaves the summaries of every finished image (and no
+        footer).
+        """
+        self.summary_file = os.path.join(output_dir, f"batch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        # Line buffered: every record is written out as soon as it is complete
+        self._summary_stream = open(self.summary_file, 'w', encoding='utf-8', buffering=1)
+        self.write_summary_record({
+            "record": "header",
+            "processing_date": datetime.now().isoformat(),
+            "input_directory": input_dir,
+            "output_directory": output_dir,
+            "log_file": self.log_file,
+            "version": MultiModelMUSIQ.VERSION,
+            "total_images": len(image_files)
+        })
+    
+    def write_summary_record(self, record: dict):
+        """Append one record to the JSONL batch summary."""
+        if self._summary_stream is not None:
+            self._summary_stream.write(json.dumps(record) + '\n')
+    
+    def record_result(self, result: dict):
+        """Journal a per-image summary, stream it to the batch summary and update the counters and running aggregates."""
+        self.journal_result(result["image_path"], result["status"], result.get("error"))
+        record = {"record": "image"}
+        record.update(result)
+        self.write_summary_record(record)
+        self.logger.event("image", **result)
+        self.cache_hits += result.get("cache_hits", 0)
+        self.cache_misses += result.get("cache_misses", 0)
+        
+        if result["status"] == "success":
+            self.processed_count += 1
+            score = result.get("average_normalized_score")
+            if score is not None:
+                self.score_total += score
+                self.score_count += 1
+                entry = {"image_name": result["image_name"], "image_path": result["image_path"], "score": score}
+                if self.best_image is None or score > self.best_image["score"]:
+                    self.best_image = entry
+                if self.worst_image is None or score < self.worst_image["score"]:
+                    self.worst_image = entry
+        elif result["status"] == "skipped":
+            self.skipped_count += 1
+        else:
+            self.failed_count += 1
+        
+        if result["status"] not in ("success", "skipped") or result.get("models_failed"):
+            # Report the image again on the next incremental scan so the
+            # failed or not loaded models are retried
+            self.scanner.forget(result["image_path"])
+    
+    def process_directory(self, input_dir: str, output_dir: str = None, prefetch: int = 0,
+                          writer_threads: int = 1, workers: int = 1, intra_op_threads: Optional[int] = None,
+                          cpu_affinity: bool = False, resume: bool = False):
+        """Process all images in a directory.
+        
+        With `prefetch` > 0 the images go through the pipelined reader /
+        inference / writer stages instead of one image at a time. With
+        `workers` > 1 they are sharded over that many model-resident processes.
+        With `resume`, images the journal records as completed by an earlier
+        (interrupted) run are left out without looking at their results.
+        """
         if output_dir is None:
             output_dir = input_dir  # Default: save JSON files in same directory as images
         
@@ -163,30 +621,65 @@ class BatchImageProcessor:
         self.log(f"Input directory: {input_dir}")
         self.log(f"Output directory: {output_dir}")
         self.log(f"Log file: {self.log_file}")
+        if self.logger.events_file:
+            self.log(f"Event stream: {self.logger.events_file}")
+        self.logger.event("batch_start", input_directory=input_dir, output_directory=output_dir,
+                          log_file=self.log_file, version=MultiModelMUSIQ.VERSION)
+        if self.result_store is not None:
+            self.log(f"Result store: {self.result_store.db_path}")
         
         # Find all images
         self.log("Scanning for images...")
         image_files = self.find_images(input_dir)
+        if self.scanner.manifest_path:
+            self.log(f"Scan manifest: {self.scanner.manifest_path} ({self.scanner.dirs_listed} directories listed, "
+                     f"{self.scanner.dirs_reused} unchanged)")
         
         if not image_files:
+            if self.scanner.manifest_path:
+                self.scanner.save()
+                self.log("No new or changed images since the last scan.")
+                self.logger.flush()
+                return
             self.log("No image files found in the specified directory.", "WARNING")
             return
         
+        self.journal = BatchJournal(self.journal_path or os.path.join(output_dir, JOURNAL_FILE))
+        if resume:
+            completed = self.journal.completed()
+            remaining = [image_path for image_path in image_files if image_path not in completed]
+            self.log(f"Resuming from journal {self.journal.path}: "
+                     f"{len(image_files) - len(remaining)} images already done, {len(remaining)} remaining")
+            image_files = remaining
+            if not image_files:
+                self.log("Nothing left to process.")
+                self.logger.flush()
+                return
+        
         self.log(f"Found {len(image_files)} image files to process")
         
+        if workers > 1:
+            if prefetch > 0:
+                self.log("--prefetch is ignored in multi-process mode", "WARNING")
+            self.log("Starting image processing...")
+            self.log("-" * 80)
+            self.open_summary(input_dir, output_dir, image_files)
+            self.journal.open(resume, input_directory=input_dir, output_directory=output_dir)
+            self.process_images_multiprocess(image_files, output_dir, workers, intra_op_threads, cpu_affinity,
+                                             input_dir)
+            self.log_completion(input_dir, output_dir, image_files)
+            return
+        
         # Initialize MUSIQ scorer
         self.log("Initializing MUSIQ models...")
         try:
-            scorer = MultiModelMUSIQ()
-            load_results = scorer.load_all_models()
-            
-            successful_loads = sum(1 for success in load_results.values() if success)
-            self.log(f"Loaded {successful_loads}/{len(load_results)} models successfully")
+            scorer = self.create_scorer()
+            successful_loads = self.load_models(scorer)
             
             if successful_loads == 0:
                 self.log("No models loaded successfully. Aborting batch processing.", "ERROR")
                 return
-                
+        
         except Exception as e:
             self.log(f"Failed to initialize MUSIQ models: {str(e)}", "ERROR")
             return
@@ -194,22 +687,26 @@ class BatchImageProcessor:
         # Process each image
         self.log("Starting image processing...")
         self.log("-" * 80)
+        self.open_summary(input_dir, output_dir, image_files)
+        self.journal.open(resume, input_directory=input_dir, output_directory=output_dir)
         
-        for i, image_path in enumerate(image_files, 1):
-            self.log(f"Progress: {i}/{len(image_files)}")
-            
-            result = self.process_single_image(image_path, scorer, output_dir)
-            self.results.append(result)
-            
-            if result["status"] == "success":
-                self.processed_count += 1
-            elif result["status"] == "skipped":
-                self.skipped_count += 1
-            else:
-                self.failed_count += 1
-            
-            self.log("-" * 40)
+        if prefetch > 0:
+            self.log(f"Pipelined mode: prefetch={prefetch}, writer threads={writer_threads}")
+            self.process_images_pipelined(image_files, scorer, output_dir, prefetch, writer_threads)
+        else:
+            for i, image_path in enumerate(image_files, 1):
+                self.log(f"Progress: {i}/{len(image_files)}", "DEBUG")
+                self.claim(image_path)
+                
+                result = self.process_single_image(image_path, scorer, output_dir)
+                self.record_result(result)
+                
+                self.log("-" * 40, "DEBUG")
         
+        self.log_completion(input_dir, output_dir, image_files)
+    
+    def log_completion(self, input_dir: str, output_dir: str, image_files: List[str]):
+        """Log the completion summary and save the batch summary file."""
         # Log completion summary
         self.log("=" * 80)
         self.log("BATCH PROCESSING COMPLETED")
@@ -219,42 +716,60 @@ class BatchImageProcessor:
         self.log(f"Skipped (already processed): {self.skipped_count}")
         self.log(f"Failed: {self.failed_count}")
         
-        if self.processed_count > 0:
-            # Calculate overall statistics
-            successful_results = [r for r in self.results if r["status"] == "success"]
-            avg_scores = [r["average_normalized_score"] for r in successful_results if r["average_normalized_score"] is not None]
-            
-            if avg_scores:
-                overall_avg = sum(avg_scores) / len(avg_scores)
-                self.log(f"Overall average normalized score: {overall_avg:.3f}")
-                
-                # Find best and worst images
-                best_image = max(successful_results, key=lambda x: x["average_normalized_score"] or 0)
-                worst_image = min(successful_results, key=lambda x: x["average_normalized_score"] or 0)
-                
-                self.log(f"Best image: {best_image['image_name']} (score: {best_image['average_normalized_score']})")
-                self.log(f"Worst image: {worst_image['image_name']} (score: {worst_image['average_normalized_score']})")
+        cache_stats = None
+        if self.score_cache_path:
+            lookups = self.cache_hits + self.cache_misses
+            cache_stats = {
+                "path": self.score_cache_path,
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": round(self.cache_hits / lookups, 3) if lookups else None
+            }
+            if self.score_cache is not None:
+                # Evictions are only known for the cache used in this process
+                cache_stats["evictions"] = self.score_cache.evictions
+                cache_stats["entries"] = self.score_cache.stats()["entries"]
+            self.log(f"Score cache: {self.cache_hits} hits, {self.cache_misses} misses")
         
-        # Save batch summary
-        summary_file = os.path.join(output_dir, f"batch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        batch_summary = {
-            "processing_date": datetime.now().isoformat(),
-            "input_directory": input_dir,
-            "output_directory": output_dir,
-            "log_file": self.log_file,
-            "version": scorer.VERSION,
+        # Overall statistics from the running aggregates
+        overall_avg = None
+        if self.score_count > 0:
+            overall_avg = self.score_total / self.score_count
+            self.log(f"Overall average normalized score: {overall_avg:.3f}")
+            self.log(f"Best image: {self.best_image['image_name']} (score: {self.best_image['score']})")
+            self.log(f"Worst image: {self.worst_image['image_name']} (score: {self.worst_image['score']})")
+        
+        # Finish the batch summary with a footer record
+        self.write_summary_record({
+            "record": "footer",
+            "completion_date": datetime.now().isoformat(),
             "total_images": len(image_files),
             "successful": self.processed_count,
             "skipped": self.skipped_count,
             "failed": self.failed_count,
-            "results": self.results
-        }
+            "scored_images": self.score_count,
+            "average_normalized_score": round(overall_avg, 3) if overall_avg is not None else None,
+            "best_image": self.best_image,
+            "worst_image": self.worst_image,
+            "score_cache": cache_stats
+        })
+        if self._summary_stream is not None:
+            self._summary_stream.close()
+            self._summary_stream = None
+        if self.journal is not None:
+            self.journal.close()
         
-        with open(summary_file, 'w') as f:
-            json.dump(batch_summary, f, indent=2)
-        
-        self.log(f"Batch summary saved to: {summary_file}")
+        self.log(f"Batch summary saved to: {self.summary_file}")
+        self.logger.event("batch_end", total_images=len(image_files), successful=self.processed_count,
+                          skipped=self.skipped_count, failed=self.failed_count, summary_file=self.summary_file)
+        if self.scanner.manifest_path:
+            self.scanner.save()
+            self.log(f"Scan manifest saved to: {self.scanner.manifest_path}")
+        if self.result_store is not None:
+            self.log(f"Results stored in: {self.result_store.db_path} "
+                     f"(export with: python result_store.py --db {self.result_store.db_path} --export-dir DIR)")
         self.log(f"Detailed log saved to: {self.log_file}")
+        self.logger.flush()
 
 
 def main():
@@ -267,12 +782,59 @@ Examples:
   python batch_process_images.py --input-dir "D:/Photos/Export/2025"
   python batch_process_images.py --input-dir "D:/Photos/Export/2025" --output-dir "D:/Results"
   python batch_process_images.py --input-dir "D:/Photos/Export/2025" --log-file "custom_log.log"
+  python batch_process_images.py --input-dir "D:/Photos/Export/2025" --prefetch 8 --writer-threads 2
+  python batch_process_images.py --input-dir "D:/Photos/Export/2025" --workers 8 --cpu-affinity
+  python batch_process_images.py --input-dir "D:/Photos/Export/2025" --result-store "D:/Results/musiq.sqlite"
+  python batch_process_images.py --input-dir "D:/Photos/Export/2025" --score-cache "D:/Results/score_cache.sqlite"
+  python batch_process_images.py --input-dir "D:/Photos/Export/2025" --scan-manifest "D:/Results/scan_manifest.json"
+  python batch_process_images.py --input-dir "D:/Photos/Export/2025" --quiet --events "D:/Results/events.jsonl"
+  python batch_process_images.py --input-dir "D:/Photos/Export/2025" --output-dir "D:/Results" --resume
         """
     )
     
     parser.add_argument('--input-dir', required=True, help='Input directory containing images')
     parser.add_argument('--output-dir', help='Output directory for JSON results (default: same as input)')
     parser.add_argument('--log-file', help='Custom log file name (default: auto-generated with timestamp)')
+    parser.add_argument('--log-level', choices=list(LEVELS), default='DEBUG',
+                       help='Minimum level written to the log and console; per-image lines are DEBUG (default: DEBUG)')
+    parser.add_argument('--quiet', action='store_true',
+                       help='One log record per image, no per-model output, only warnings and errors on the console')
+    parser.add_argument('--journal',
+                       help=f'Write-ahead journal of processed images (default: {JOURNAL_FILE} in the output directory)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted run: skip images the journal records as done')
+    parser.add_argument('--events',
+                       help='Append per-image detail (scores, timings, cache use) as JSON lines to this file')
+    parser.add_argument('--prefetch', type=int, default=0,
+                       help='Pipelined mode: number of images to read ahead of inference (default: 0, sequential)')
+    parser.add_argument('--writer-threads', type=int, default=1,
+                       help='Pipelined mode: number of threads saving JSON results (default: 1)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of worker processes, each with its own loaded models (default: 1)')
+    parser.add_argument('--intra-op-threads', type=int,
+                       help='TensorFlow intra-op threads per worker (default: CPUs divided by workers)')
+    parser.add_argument('--cpu-affinity', action='store_true',
+                       help='Pin each worker process to its own contiguous set of CPUs (Linux only)')
+    parser.add_argument('--result-store',
+                       help='SQLite database for results, keyed by relative path, instead of per-image JSON files')
+    parser.add_argument('--export-json', action='store_true',
+                       help='With --result-store: also export per-image JSON files to the output directory when done')
+    parser.add_argument('--score-cache',
+                       help='SQLite content-hash score cache; renamed, moved or copied images are not rescored')
+    parser.add_argument('--score-cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                       help=f'Maximum number of images kept in the score cache (default: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--offline', action='store_true',
+                       help='Do not contact TF Hub or Kaggle Hub; load cached artifacts or local checkpoints only')
+    parser.add_argument('--prefer-local', action='store_true',
+                       help='Try local checkpoints first (.npz checkpoints run natively with JAX)')
+    parser.add_argument('--parallel-models', action='store_true',
+                       help='Run the models of each image concurrently instead of one after another')
+    parser.add_argument('--lazy-load', action='store_true',
+                       help='Load each model the first time an image needs it instead of all models up front')
+    parser.add_argument('--scan-manifest',
+                       help='Incremental mode: JSON manifest of scanned files; only new or changed images are processed')
+    parser.add_argument('--full-rescan', action='store_true',
+                       help='With --scan-manifest: re-stat every file, also in directories whose mtime is unchanged')
     
     args = parser.parse_args()
     
@@ -285,18 +847,43 @@ Examples:
         print(f"Error: Input path is not a directory: {args.input_dir}")
         sys.exit(1)
     
+    if args.export_json and not args.result_store:
+        print("Error: --export-json requires --result-store")
+        sys.exit(1)
+    
+    result_store = None
+    if args.result_store:
+        result_store_dir = os.path.dirname(os.path.abspath(args.result_store))
+        os.makedirs(result_store_dir, exist_ok=True)
+        result_store = ResultStore(args.result_store, args.input_dir)
+    
     # Initialize processor with output directory for log file
-    processor = BatchImageProcessor(args.log_file, args.output_dir)
+    processor = BatchImageProcessor(args.log_file, args.output_dir, result_store,
+                                    score_cache_path=args.score_cache, score_cache_size=args.score_cache_size,
+                                    scan_manifest=args.scan_manifest, full_rescan=args.full_rescan,
+                                    log_level=args.log_level, quiet=args.quiet, events_file=args.events,
+                                    journal_path=args.journal, offline=args.offline, lazy_load=args.lazy_load,
+                                    prefer_local=args.prefer_local, parallel_models=args.parallel_models)
     
     # Process directory
     try:
-        processor.process_directory(args.input_dir, args.output_dir)
+        processor.process_directory(args.input_dir, args.output_dir,
+                                    prefetch=args.prefetch, writer_threads=args.writer_threads,
+                                    workers=args.workers, intra_op_threads=args.intra_op_threads,
+                                    cpu_affinity=args.cpu_affinity, resume=args.resume)
+        if result_store is not None and args.export_json:
+            export_dir = args.output_dir or args.input_dir
+            written = result_store.export_json(export_dir)
+            processor.log(f"Exported {written} JSON files to: {export_dir}")
     except KeyboardInterrupt:
         processor.log("Batch processing interrupted by user", "WARNING")
         sys.exit(1)
     except Exception as e:
         processor.log(f"Unexpected error during batch processing: {str(e)}", "ERROR")
         sys.exit(1)
+    finally:
+        # INFO lines are buffered until the flush interval has passed
+        processor.logger.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Dynamic micro-batching scheduler in front of a loaded MultiModelMUSIQ.
+
+Concurrent callers submit images; a scheduler thread gathers requests for
+up to `max_wait_ms` (or until `max_batch_size` are waiting) and scores them
+together, model by model, with MultiModelMUSIQ.predict_batch. Native .npz
+models (musiq_jax_backend.py) run each batch as one padded forward pass;
+the TF Hub / Kaggle signatures take a single image per call, so for them a
+batch is a run of back-to-back calls on one model.
+
+Requests whose content hash is already queued or being scored are attached
+to that request instead of being scored again. Per-request latency
+percentiles, batch sizes and the number of coalesced requests are reported
+by stats().
+"""
+
+import argparse
+import copy
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+from run_all_musiq_models import ImageInput, MultiModelMUSIQ
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of `values` (fraction in 0..1), or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _Request:
+    """One submitted image and the future its caller waits on."""
+    
+    def __init__(self, image: ImageInput):
+        self.image = image
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """Gathers concurrent scoring requests into micro-batches and coalesces duplicates."""
+    
+    def __init__(self, scorer: MultiModelMUSIQ, max_batch_size: int = 8, max_wait_ms: float = 5.0,
+                 models: Optional[List[str]] = None, history: int = 10000):
+        self.scorer = scorer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.models = models
+        
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        # Most recent per-request latencies (seconds) and batch sizes
+        self.latencies = deque(maxlen=history)
+        self.batch_sizes = deque(maxlen=history)
+        
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # Content hash -> requests waiting for that content (the first one is scored)
+        self._in_flight: Dict[str, List[_Request]] = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="musiq-batcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, image: Union[str, bytes, ImageInput], name: Optional[str] = None) -> Future:
+        """Queue an image (path, encoded bytes or ImageInput); the future resolves to its results dict.
+        
+        Raises RuntimeError once the scheduler is closed.
+        """
+        if isinstance(image, (bytes, bytearray)):
+            image = ImageInput(bytes(image), name or "upload")
+        elif not isinstance(image, ImageInput):
+            image = ImageInput.from_path(image)
+        
+        request = _Request(image)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatchScheduler is closed")
+            self.requests += 1
+            waiting = self._in_flight.get(image.content_hash)
+            if waiting is not None:
+                # Same bytes already queued or being scored: share that result
+                waiting.append(request)
+                self.coalesced += 1
+                return request.future
+            self._in_flight[image.content_hash] = [request]
+            # Under the lock, so it is queued before close()'s sentinel
+            self._queue.put(image.content_hash)
+        return request.future
+    
+    def score(self, image: Union[str, bytes, ImageInput], name: Optional[str] = None,
+              timeout: Optional[float] = None) -> Dict[str, any]:
+        """Submit an image and wait for its results."""
+        return self.submit(image, name).result(timeout)
+    
+    def _run(self):
+        """Scheduler thread: gather a batch, score it, repeat until closed."""
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            batch = [key]
+            deadline = time.perf_counter() + self.max_wait
+            closing = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    key = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if key is None:
+                    closing = True
+                    break
+                batch.append(key)
+            self._score_batch(batch)
+            if closing:
+                return
+    
+    def _score_batch(self, keys: List[str]):
+        """Score one batch model by model and deliver the results to every waiting request."""
+        with self._lock:
+            leaders = [self._in_flight[key][0] for key in keys]
+        images = [request.image for request in leaders]
+        self.batches += 1
+        self.batch_sizes.append(len(images))
+        
+        try:
+            model_names = [name for name in (self.models or self.scorer.model_sources)
+                           if self.scorer.is_available(name)]
+            scores = [{} for _ in images]
+            for model_name in model_names:
+                start = time.perf_counter()
+                batch_scores = self.scorer.predict_batch(images, model_name)
+                # Attribute the batch's inference time evenly to its images
+                per_image = (time.perf_counter() - start) / len(images)
+                for image_scores, score in zip(scores, batch_scores):
+                    image_scores[model_name] = (score, per_image)
+            outcomes = [(self.scorer.run_all_models(image, models=self.models, quiet=True, scores=image_scores), None)
+                        for image, image_scores in zip(images, scores)]
+        except Exception as e:
+            outcomes = [(None, e)] * len(images)
+        
+        for key, (results, error) in zip(keys, outcomes):
+            # Later submissions of this content start a new request
+            with self._lock:
+                waiting = self._in_flight.pop(key)
+            for i, request in enumerate(waiting):
+                if error is not None:
+                    request.future.set_exception(error)
+                    continue
+                if i > 0:
+                    # Coalesced request: same scores, its own name
+                    results = copy.deepcopy(results)
+                    results["image_path"] = request.image.image_path
+                    results["image_name"] = os.path.basename(request.image.image_path)
+                self.latencies.append(time.perf_counter() - request.submitted)
+                request.future.set_result(results)
+    
+    def stats(self) -> Dict[str, any]:
+        """Request, coalescing, batch size and latency statistics (latencies in milliseconds)."""
+        latencies = [latency * 1000 for latency in self.latencies]
+        batch_sizes = list(self.batch_sizes)
+        
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 2) if value is not None else None
+        
+        # Bucket padding and compile counts of native JAX models
+        padding = {model_name: model.padding_report() for model_name, model in self.scorer.models.items()
+                   if hasattr(model, "padding_report")}
+        
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "mean_batch_size": rounded(sum(batch_sizes) / len(batch_sizes)) if batch_sizes else None,
+            "batch_size_histogram": dict(sorted(Counter(batch_sizes).items())),
+            "latency_ms": {
+                "p50": rounded(percentile(latencies, 0.50)),
+                "p90": rounded(percentile(latencies, 0.90)),
+                "p99": rounded(percentile(latencies, 0.99)),
+                "max": rounded(max(latencies)) if latencies else None
+            },
+            "jax_padding": padding
+        }
+    
+    def close(self):
+        """Score what is queued and stop the scheduler thread; later submits raise RuntimeError."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._thread.join()
+    
+    def __enter__(self) -> "MicroBatchScheduler":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Score images from many concurrent clients through the micro-batching scheduler",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python batch_scheduler.py *.jpg --clients 16 --max-batch 8 --max-wait-ms 10
+  python batch_scheduler.py *.jpg --models spaq koniq --prefer-local
+
+Prints the scheduler statistics (batch sizes, coalesced requests, latency
+percentiles) as JSON when all images are scored.
+        """
+    )
+    
+    parser.add_argument('images', nargs='+', help='Image paths')
+    parser.add_argument('--models', nargs='+',
+                       choices=['spaq', 'ava', 'koniq', 'paq2piq', 'vila'],
+                       help='Models to load and run (default: all models)')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads (default: 8)')
+    parser.add_argument('--max-batch', type=int, default=8, help='Maximum images per batch (default: 8)')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                       help='How long to gather requests for a batch, in milliseconds (default: 5)')
+    parser.add_argument('--offline', action='store_true',
+                       help='Do not contact TF Hub or Kaggle Hub; load cached artifacts or local checkpoints only')
+    parser.add_argument('--prefer-local', action='store_true',
+                       help='Try local checkpoints first (.npz checkpoints run natively with JAX)')
+    
+    args = parser.parse_args()
+    
+    missing = [image_path for image_path in args.images if not os.path.exists(image_path)]
+    if missing:
+        print(f"Error: Image file not found: {', '.join(missing)}")
+        sys.exit(1)
+    
+    scorer = MultiModelMUSIQ(offline=args.offline, prefer_local=args.prefer_local)
+    if not any(scorer.load_all_models(args.models).values()):
+        print("Error: No models loaded successfully")
+        sys.exit(1)
+    
+    start = time.perf_counter()
+    with MicroBatchScheduler(scorer, args.max_batch, args.max_wait_ms, args.models) as scheduler:
+        with ThreadPoolExecutor(max_workers=args.clients) as clients:
+            for results in clients.map(scheduler.score, args.images):
+                score = results["summary"].get("advanced_scoring", {}).get("final_robust_score")
+                print(f"{results['image_path']}: final robust score {score}")
+        elapsed = time.perf_counter() - start
+        stats = scheduler.stats()
+    
+    stats["images_per_second"] = round(len(args.images) / elapsed, 2) if elapsed > 0 else None
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Parity check and benchmark of packed against padded and single-image inference.
+
+Scores the same multi-scale patch sequences three ways with the native JAX
+model (musiq_original/run_predict_image.py): one image per call, all images
+in one zero-padded batch (stack_sequences), and packed several to a row with
+segment-aware attention (pack_sequences, Model(num_segments=...)). Reports the
+largest score difference of the batched modes from the single-image scores
+and the median forward-pass time of the padded and packed batches. Exits with
+status 1 if a difference exceeds --atol.
+
+With --checkpoint the weights of an .npz checkpoint are used; otherwise a
+small randomly initialised model with the same preprocessing, so the check
+runs without downloading checkpoints.
+
+Requires the packages in musiq_original/requirements.txt (jax, jaxlib,
+flax==0.3.3, ml-collections).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import jax
+import jax.numpy as jnp
+import ml_collections
+import numpy as np
+
+import numpy_preprocessing
+from musiq_original.model import multiscale_transformer as model_mod
+from musiq_original.run_predict_image import (get_batched_predict_fn, get_params_and_config, pack_sequences,
+                                              stack_sequences)
+
+# Preprocessing config of the multi-scale MUSIQ checkpoints (run_predict_image._PP_CONFIG)
+PP_CONFIG = {
+    "patch_size": 32,
+    "patch_stride": 32,
+    "hse_grid_size": 10,
+    "longer_side_lengths": [224, 384],
+    "max_seq_len_from_original_res": -1
+}
+
+# Small model with the checkpoints' architecture, used without --checkpoint
+RANDOM_MODEL_CONFIG = {
+    "hidden_size": 64,
+    "representation_size": None,
+    "resnet_emb": {"num_layers": 5},
+    "transformer": {
+        "attention_dropout_rate": 0,
+        "dropout_rate": 0,
+        "mlp_dim": 128,
+        "num_heads": 2,
+        "num_layers": 4,
+        "num_scales": 3,
+        "spatial_pos_grid_size": 10,
+        "use_scale_emb": True,
+        "use_sinusoid_pos_emb": False
+    }
+}
+
+# Synthetic image sizes (height, width) used when no images are given
+DEFAULT_SIZES = [(240, 320), (320, 240), (200, 200), (96, 160), (480, 640), (150, 100)]
+
+
+def median_seconds(fn: Callable[[], np.ndarray], repeat: int) -> Tuple[float, np.ndarray]:
+    """Run `fn` once to compile and warm up, then `repeat` times; return the median time and the last output."""
+    output = np.asarray(fn())
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = np.asarray(fn())
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), output
+
+
+def load_sequences(image_paths: List[str], sizes: List[Tuple[int, int]]) -> List[Tuple[str, np.ndarray]]:
+    """Patch sequences of the given images, or of random images of the default sizes."""
+    if not image_paths:
+        rng = np.random.default_rng(0)
+        images = [(f"random {h}x{w}", rng.integers(0, 256, (h, w, 3), dtype=np.uint8)) for h, w in sizes]
+    else:
+        images = []
+        for image_path in image_paths:
+            with open(image_path, 'rb') as f:
+                images.append((os.path.basename(image_path), numpy_preprocessing.decode_image(f.read())))
+    return [(name, numpy_preprocessing.get_multiscale_patches(image, **PP_CONFIG)) for name, image in images]
+
+
+def random_params(model_config: ml_collections.ConfigDict, num_classes: int, sequence: np.ndarray):
+    """Randomly initialised parameters, with the zero-initialised head and CLS token perturbed too."""
+    model = model_mod.Model.partial(num_classes=num_classes, train=False, **model_config)
+    _, params = model.init(jax.random.PRNGKey(0), jnp.asarray(sequence[np.newaxis]))
+    leaves, treedef = jax.tree_util.tree_flatten(params)
+    keys = jax.random.split(jax.random.PRNGKey(1), len(leaves))
+    return jax.tree_util.tree_unflatten(
+        treedef, [leaf + 0.05 * jax.random.normal(key, leaf.shape) for leaf, key in zip(leaves, keys)])
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Check packed inference of the native MUSIQ model against padded and single-image inference",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmark_packing.py
+  python benchmark_packing.py --num-classes 10
+  python benchmark_packing.py sample1.jpg sample2.jpg --checkpoint musiq_original/checkpoints/spaq_ckpt.npz
+        """
+    )
+    
+    parser.add_argument('images', nargs='*', help='Images to test (default: random images of several sizes)')
+    parser.add_argument('--checkpoint', help='.npz checkpoint (default: a small randomly initialised model)')
+    parser.add_argument('--num-classes', type=int, default=1,
+                       help='Model outputs: 1 for a MOS score, 10 for the AVA distribution (default: 1)')
+    parser.add_argument('--pack-length', type=int, default=1024,
+                       help='Packed row length; raised to the longest sequence if needed (default: 1024)')
+    parser.add_argument('--max-segments', type=int, default=8, help='Maximum images per packed row (default: 8)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per batch mode (default: 5)')
+    parser.add_argument('--atol', type=float, default=1e-4,
+                       help='Maximum allowed absolute score difference (default: 1e-4)')
+    
+    args = parser.parse_args()
+    
+    missing = [path for path in args.images + ([args.checkpoint] if args.checkpoint else []) if not os.path.exists(path)]
+    if missing:
+        print(f"Error: File not found: {', '.join(missing)}")
+        sys.exit(1)
+    
+    named_sequences = load_sequences(args.images, DEFAULT_SIZES)
+    names = [name for name, _ in named_sequences]
+    sequences = [sequence for _, sequence in named_sequences]
+    
+    if args.checkpoint:
+        model_config, _, params = get_params_and_config(args.checkpoint)
+    else:
+        model_config = ml_collections.ConfigDict(RANDOM_MODEL_CONFIG)
+        params = random_params(model_config, args.num_classes, sequences[0])
+    
+    predict = get_batched_predict_fn(model_config, args.num_classes)
+    longest = max(int(np.count_nonzero(sequence[:, -1])) for sequence in sequences)
+    pack_length = max(args.pack_length, longest)
+    packed_predict = get_batched_predict_fn(model_config, args.num_classes, args.max_segments)
+    
+    single = np.array([float(predict(params, sequence[np.newaxis])[0]) for sequence in sequences])
+    padded_batch = stack_sequences(sequences)
+    packed_batch, placements = pack_sequences(sequences, pack_length, args.max_segments)
+    padded_seconds, padded = median_seconds(lambda: predict(params, padded_batch), args.repeat)
+    packed_seconds, packed_rows = median_seconds(lambda: packed_predict(params, packed_batch), args.repeat)
+    packed = np.array([packed_rows[row, segment] for row, segment in placements])
+    
+    for name, sequence, single_score, padded_score, packed_score in zip(names, sequences, single, padded, packed):
+        print(f"{name}: {int(np.count_nonzero(sequence[:, -1]))} patches, single {single_score:.6f}, "
+              f"padded {padded_score:.6f}, packed {packed_score:.6f}")
+    
+    padded_diff = float(np.abs(padded - single).max())
+    packed_diff = float(np.abs(packed - single).max())
+    print(f"Padded batch {padded_batch.shape[0]}x{padded_batch.shape[1]}: max diff {padded_diff:.2e}, "
+          f"{padded_seconds * 1000:.1f} ms")
+    print(f"Packed batch {packed_batch.shape[0]}x{packed_batch.shape[1]} (up to {args.max_segments} images per row): "
+          f"max diff {packed_diff:.2e}, {packed_seconds * 1000:.1f} ms ({padded_seconds / packed_seconds:.2f}x)")
+    
+    if max(padded_diff, packed_diff) > args.atol:
+        print(f"Parity check failed: scores differ by more than {args.atol}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Parity check and benchmark of the NumPy patch extractor against the TF graph.
+
+Runs musiq_original/model/preprocessing.get_multiscale_patches and
+numpy_preprocessing.get_multiscale_patches on the same decoded pixels,
+checks that both produce the same patch sequence (shape, patch values within
+--atol, identical position / scale / mask columns) and reports the median
+time of each engine. Exits with status 1 if any image fails the parity check.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+import musiq_original.model.preprocessing as pp_lib
+import numpy_preprocessing
+
+# Preprocessing config of the multi-scale MUSIQ checkpoints (run_predict_image._PP_CONFIG)
+PP_CONFIG = {
+    "patch_size": 32,
+    "patch_stride": 32,
+    "hse_grid_size": 10,
+    "longer_side_lengths": [224, 384],
+    "max_seq_len_from_original_res": -1
+}
+
+# Synthetic image sizes (height, width) used when no images are given
+DEFAULT_SIZES = [(480, 640), (768, 1024), (1080, 1920), (3000, 4000)]
+
+
+def median_seconds(fn: Callable[[], np.ndarray], repeat: int) -> Tuple[float, np.ndarray]:
+    """Run `fn` once to warm up, then `repeat` times; return the median time and the last output."""
+    output = fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), output
+
+
+def load_images(image_paths: List[str], sizes: List[Tuple[int, int]]) -> List[Tuple[str, np.ndarray]]:
+    """Decode the given images (with the TF decoder), or make random images of the default sizes."""
+    if not image_paths:
+        rng = np.random.default_rng(0)
+        return [(f"random {h}x{w}", rng.integers(0, 256, (h, w, 3), dtype=np.uint8)) for h, w in sizes]
+    images = []
+    for image_path in image_paths:
+        with open(image_path, 'rb') as f:
+            images.append((os.path.basename(image_path), pp_lib.decode_image(tf.constant(f.read())).numpy()))
+    return images
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Check the NumPy patch extractor against the TF preprocessing graph and time both",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmark_preprocessing.py
+  python benchmark_preprocessing.py sample1.jpg sample2.jpg --repeat 20
+  python benchmark_preprocessing.py --pyramid
+        """
+    )
+    
+    parser.add_argument('images', nargs='*', help='Images to test (default: random images of several sizes)')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per engine and image (default: 10)')
+    parser.add_argument('--atol', type=float, default=1e-5,
+                       help='Maximum allowed absolute difference of patch values (default: 1e-5)')
+    parser.add_argument('--pyramid', action='store_true',
+                       help='Also time pyramid resizing and report its deviation from the TF output')
+    
+    args = parser.parse_args()
+    
+    missing = [image_path for image_path in args.images if not os.path.exists(image_path)]
+    if missing:
+        print(f"Error: Image file not found: {', '.join(missing)}")
+        sys.exit(1)
+    
+    failed = 0
+    with tf.device('/CPU:0'):
+        for name, image in load_images(args.images, DEFAULT_SIZES):
+            image_tensor = tf.constant(image)
+            tf_seconds, expected = median_seconds(
+                lambda: pp_lib.get_multiscale_patches(pp_lib.normalize_value_range(image_tensor),
+                                                      **PP_CONFIG).numpy(), args.repeat)
+            np_seconds, actual = median_seconds(
+                lambda: numpy_preprocessing.get_multiscale_patches(image, **PP_CONFIG), args.repeat)
+            
+            if expected.shape != actual.shape:
+                print(f"{name}: FAILED shape {actual.shape} != {expected.shape}")
+                failed += 1
+                continue
+            max_diff = float(np.abs(expected[:, :-3] - actual[:, :-3]).max())
+            columns_match = np.array_equal(expected[:, -3:], actual[:, -3:])
+            status = "ok" if max_diff <= args.atol and columns_match else "FAILED"
+            failed += status == "FAILED"
+            
+            print(f"{name}: {status} ({expected.shape[0]} patches, max diff {max_diff:.2e}, "
+                  f"position/scale/mask columns {'identical' if columns_match else 'DIFFER'})")
+            print(f"  TF graph: {tf_seconds * 1000:.1f} ms, NumPy: {np_seconds * 1000:.1f} ms "
+                  f"({tf_seconds / np_seconds:.2f}x)")
+            
+            if args.pyramid:
+                pyramid_seconds, pyramid = median_seconds(
+                    lambda: numpy_preprocessing.get_multiscale_patches(image, pyramid=True, **PP_CONFIG),
+                    args.repeat)
+                print(f"  NumPy pyramid: {pyramid_seconds * 1000:.1f} ms ({tf_seconds / pyramid_seconds:.2f}x), "
+                      f"mean abs deviation {float(np.abs(expected - pyramid).mean()):.2e}")
+    
+    if failed:
+        print(f"Parity check failed for {failed} image(s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
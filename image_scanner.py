@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Single-pass image directory scanner with an incremental mtime manifest.
+
+One os.scandir walk replaces the per-extension glob passes, and extensions
+match case-insensitively (IMG_0001.JPG is found on Linux too). With a manifest,
+later runs report only new or changed files: a directory whose mtime is
+unchanged has the same entries as last time, so its files are taken from the
+manifest without being stat'ed again and only its subdirectories are visited.
+
+Note: rewriting a file in place does not change its directory's mtime; use
+full_rescan to re-stat every file when that matters. A manifest saved with a
+different `key` (e.g. the model versions the files were scored with) is
+ignored, so every file is reported again.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif')
+
+MANIFEST_VERSION = 1
+
+# Paths read from stdin ('-'), kept so a second caller in the same process
+# (e.g. the in-process fallback after the daemon client) sees them too
+_stdin_paths = None
+
+
+class ImageScanner:
+    """Find image files with one os.scandir walk, optionally tracking changes in a manifest."""
+    
+    def __init__(self, manifest_path: Optional[str] = None, extensions=IMAGE_EXTENSIONS,
+                 full_rescan: bool = False, key: Optional[str] = None):
+        self.manifest_path = manifest_path
+        self.extensions = {ext.lower() for ext in extensions}
+        self.full_rescan = full_rescan
+        self.key = key
+        self.root = None
+        self.dirs_listed = 0
+        self.dirs_reused = 0
+        self._previous = {}
+        self._dirs = {}
+        
+        if manifest_path and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get("version") == MANIFEST_VERSION and manifest.get("key") == key:
+                    self.root = manifest.get("root")
+                    self._previous = manifest.get("dirs", {})
+            except Exception as e:
+                print(f"Warning: ignoring unreadable scan manifest {manifest_path}: {e}")
+    
+    def scan(self, directory: str, only_changed: bool = False) -> List[str]:
+        """Return sorted image paths under `directory`.
+        
+        With `only_changed`, only files that are new or whose size or mtime
+        changed since the manifest was saved are returned.
+        """
+        root = os.path.abspath(directory)
+        previous = self._previous if self.root == root else {}
+        self.root = root
+        self._dirs = {}
+        self.dirs_listed = 0
+        self.dirs_reused = 0
+        
+        found = []
+        pending = ['']
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+            try:
+                dir_mtime = os.stat(abs_dir).st_mtime_ns
+            except OSError:
+                continue
+            
+            old = previous.get(rel_dir)
+            if old is not None and old["mtime_ns"] == dir_mtime and not self.full_rescan:
+                # Same entries as last time: reuse them without stat'ing files
+                entry = old
+                self.dirs_reused += 1
+                changed = set()
+            else:
+                entry = self._list_dir(abs_dir, dir_mtime)
+                self.dirs_listed += 1
+                old_files = old["files"] if old is not None else {}
+                changed = {name for name, stat in entry["files"].items() if old_files.get(name) != stat}
+            
+            self._dirs[rel_dir] = entry
+            for name in entry["files"]:
+                if not only_changed or name in changed:
+                    found.append(os.path.join(abs_dir, name))
+            pending.extend(os.path.join(rel_dir, name) if rel_dir else name for name in entry["subdirs"])
+        
+        return sorted(found)
+    
+    def _list_dir(self, abs_dir: str, dir_mtime: int) -> Dict[str, any]:
+        """List one directory: image files with (size, mtime) and subdirectory names."""
+        files = {}
+        subdirs = []
+        try:
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif os.path.splitext(entry.name)[1].lower() in self.extensions and entry.is_file():
+                            stat = entry.stat()
+                            files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Warning: cannot list {abs_dir}: {e}")
+        return {"mtime_ns": dir_mtime, "files": files, "subdirs": sorted(subdirs)}
+    
+    def forget(self, image_path: str):
+        """Drop a file from the manifest so the next incremental scan reports it again (e.g. after a failure)."""
+        if self.root is None:
+            return
+        rel_dir, name = os.path.split(os.path.relpath(os.path.abspath(image_path), self.root))
+        entry = self._dirs.get(rel_dir)
+        if entry is not None and name in entry["files"]:
+            # Copy so a reused entry shared with the previous manifest is not mutated
+            entry = dict(entry, files=dict(entry["files"]))
+            del entry["files"][name]
+            # A changed directory mtime forces a fresh listing next time
+            entry["mtime_ns"] = -1
+            self._dirs[rel_dir] = entry
+    
+    def save(self):
+        """Write the manifest of the last scan (atomically)."""
+        if not self.manifest_path or self.root is None:
+            return
+        manifest = {"version": MANIFEST_VERSION, "key": self.key, "root": self.root, "dirs": self._dirs}
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self.manifest_path)
+        self._previous = self._dirs
+
+
+def read_path_list(source: str) -> List[str]:
+    """Read newline-delimited paths from a file, or from stdin for '-'; blank and '#' lines are skipped."""
+    global _stdin_paths
+    if source == '-':
+        if _stdin_paths is None:
+            _stdin_paths = sys.stdin.read().splitlines()
+        lines = _stdin_paths
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def expand_image_args(patterns: List[str], manifest: Optional[str] = None,
+                      extensions=IMAGE_EXTENSIONS) -> List[str]:
+    """Expand image arguments into a list of paths, in the order given and without duplicates.
+    
+    Each argument is a path or a glob pattern ('*', '?', '[...]', recursive
+    '**'); glob matches are sorted and limited to image extensions, as
+    Windows shells do not expand patterns. An existing path is taken
+    literally even if it contains glob characters (e.g. 'IMG [1].jpg').
+    Paths listed in `manifest` (a
+    file, or '-' for stdin) follow. Plain paths are kept even if missing, so
+    the caller can report them.
+    """
+    extensions = {ext.lower() for ext in extensions}
+    entries = list(patterns)
+    if manifest:
+        entries.extend(read_path_list(manifest))
+    
+    paths = []
+    seen = set()
+    for entry in entries:
+        if glob.has_magic(entry) and not os.path.exists(entry):
+            matches = sorted(path for path in glob.glob(entry, recursive=True)
+                             if os.path.splitext(path)[1].lower() in extensions and os.path.isfile(path))
+            if not matches:
+                print(f"Warning: no images match {entry}", file=sys.stderr)
+        else:
+            matches = [entry]
+        for path in matches:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                paths.append(path)
+    return paths
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="List image files in a directory tree, optionally only those changed since the last scan",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python image_scanner.py --input-dir "D:/Photos/Export/2025"
+  python image_scanner.py --input-dir "D:/Photos/Export/2025" --manifest scan_manifest.json --only-changed
+        """
+    )
+    
+    parser.add_argument('--input-dir', required=True, help='Directory to scan')
+    parser.add_argument('--manifest', help='Manifest file used to detect new or changed files')
+    parser.add_argument('--only-changed', action='store_true', help='Only list files new or changed since the manifest')
+    parser.add_argument('--full-rescan', action='store_true', help='Re-stat every file even in unchanged directories')
+    
+    args = parser.parse_args()
+    
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: Input path is not a directory: {args.input_dir}")
+        sys.exit(1)
+    
+    scanner = ImageScanner(args.manifest, full_rescan=args.full_rescan)
+    for image_path in scanner.scan(args.input_dir, only_changed=args.only_changed):
+        print(image_path)
+    scanner.save()
+    
+    print(f"Directories listed: {scanner.dirs_listed}, reused from manifest: {scanner.dirs_reused}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Persistent model resolution cache for MultiModelMUSIQ.load_model.
+
+Records which source (TF Hub, Kaggle Hub or local checkpoint) a model was
+loaded from and the resolved on-disk SavedModel path, so later processes load
+that path directly instead of walking the TF Hub -> Kaggle Hub -> local
+fallback chain. Sources that failed are remembered for a limited time
+(negative TTL) and skipped until then, so air-gapped machines do not wait on
+network timeouts at every start.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+
+# Default cache file, next to the scripts
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_resolution_cache.json")
+
+# Failed sources are skipped for this long (seconds) before being retried
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+
+
+class ResolutionCache:
+    """Where each model was resolved to, plus recent per-source failures, in a small JSON file."""
+    
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, negative_ttl: float = DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._entries = {}
+        # Models may be loaded concurrently from several threads
+        self._lock = threading.RLock()
+        
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except Exception as e:
+                print(f"Warning: ignoring unreadable model resolution cache {path}: {e}")
+    
+    def resolved(self, model_name: str, locations: Dict[str, Optional[str]]) -> Optional[Dict[str, str]]:
+        """Return {"source", "path"} of the artifact that last worked, if it is still on disk.
+        
+        `locations` are the model's current sources ({"tfhub": url, ...}); an
+        entry recorded for a different URL or Kaggle handle is ignored.
+        """
+        entry = self._entries.get(model_name, {}).get("resolved")
+        if not entry or locations.get(entry["source"]) != entry["location"]:
+            return None
+        if not os.path.exists(entry["path"]):
+            return None
+        return entry
+    
+    def failed_recently(self, model_name: str, source: str, location: Optional[str]) -> Optional[float]:
+        """Return how many seconds ago `source` failed for this model, if within the negative TTL."""
+        failure = self._entries.get(model_name, {}).get("failures", {}).get(source)
+        if not failure or failure["location"] != location:
+            return None
+        age = time.time() - failure["time"]
+        return age if age < self.negative_ttl else None
+    
+    def record_success(self, model_name: str, source: str, location: str, path: str):
+        """Remember the source and on-disk path a model was loaded from."""
+        with self._lock:
+            entry = self._entries.setdefault(model_name, {})
+            entry["resolved"] = {"source": source, "location": location, "path": os.path.abspath(path),
+                                 "time": time.time()}
+            entry.get("failures", {}).pop(source, None)
+            self.save()
+    
+    def record_failure(self, model_name: str, source: str, location: Optional[str], error: Exception):
+        """Remember that a source failed, so it is skipped until the negative TTL expires."""
+        with self._lock:
+            failures = self._entries.setdefault(model_name, {}).setdefault("failures", {})
+            failures[source] = {"location": location, "time": time.time(), "error": str(error)[:200]}
+            self.save()
+    
+    def forget(self, model_name: str):
+        """Drop the resolved artifact of a model (e.g. after it failed to load)."""
+        with self._lock:
+            self._entries.get(model_name, {}).pop("resolved", None)
+            self.save()
+    
+    def clear_failures(self):
+        """Drop all remembered failures, so every source is tried again."""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.pop("failures", None)
+            self.save()
+    
+    def entries(self) -> Dict[str, dict]:
+        """Return the raw cache entries."""
+        return self._entries
+    
+    def save(self):
+        """Write the cache (atomically); an unwritable location only produces a warning."""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, indent=2)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"Warning: could not save model resolution cache {self.path}: {e}")
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Inspect or reset the MUSIQ model resolution cache",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python model_resolution.py
+  python model_resolution.py --clear-failures
+        """
+    )
+    
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                       help=f'Path to the resolution cache (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--clear-failures', action='store_true',
+                       help='Forget failed sources so they are tried again on the next load')
+    
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.cache):
+        print(f"Error: Resolution cache not found: {args.cache}")
+        sys.exit(1)
+    
+    cache = ResolutionCache(args.cache)
+    for model_name, entry in sorted(cache.entries().items()):
+        resolved = entry.get("resolved")
+        if resolved:
+            print(f"{model_name.upper()}: {resolved['source']} -> {resolved['path']}")
+        else:
+            print(f"{model_name.upper()}: not resolved")
+        for source, failure in entry.get("failures", {}).items():
+            age_minutes = (time.time() - failure["time"]) / 60
+            print(f"  {source} failed {age_minutes:.0f} min ago: {failure['error']}")
+    
+    if args.clear_failures:
+        cache.clear_failures()
+        print("Cleared failed sources")
+
+
+if __name__ == "__main__":
+    main()
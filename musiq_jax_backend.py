@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Native MUSIQ inference from the original .npz checkpoints.
+
+Loads spaq_ckpt.npz, ava_ckpt.npz, koniq_ckpt.npz and paq2piq_ckpt.npz with
+the original JAX/Flax implementation in musiq_original (get_params_and_config,
+multiscale_transformer.Model) and runs the model jit-compiled. This scores
+fully offline without TF Hub or Kaggle Hub, and exposes the patch input and
+the forward pass directly, so callers control preprocessing and batching
+instead of going through an opaque SavedModel signature.
+
+Preprocessing runs either the original TF graph or the equivalent NumPy
+patch extractor in numpy_preprocessing.py (preprocess_engine="numpy").
+
+With max_seq_len_from_original_res=-1 every image size gives a different
+sequence length, and jit compiles once per input shape. Sequences are
+therefore padded to a fixed set of bucket lengths and batch sizes to powers
+of two, so a long-running scorer compiles a small, bounded set of
+executables and a batch is only padded to its bucket, not to its longest
+member. Padding overhead and compile counts are kept in `stats`.
+
+With pack_length set, images of at most pack_length unmasked patches are
+packed several to a row instead (pack_sequences): each gets its own segment
+id, attention is block-diagonal over segments, and each segment has its own
+CLS token, so a mixed-size batch carries almost no padding tokens.
+benchmark_packing.py checks packed scores against padded and single-image
+scores.
+
+Requires the packages in musiq_original/requirements.txt (jax, jaxlib,
+flax==0.3.3, ml-collections).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+import musiq_original.model.preprocessing as pp_lib
+import numpy_preprocessing
+from musiq_original.run_predict_image import (get_batched_predict_fn, get_params_and_config, pack_sequences,
+                                              stack_sequences)
+
+
+# Number of predicted classes per checkpoint: AVA predicts a distribution
+# over scores 1-10, the other datasets a single MOS value
+CHECKPOINT_NUM_CLASSES = {
+    "spaq": 1,
+    "ava": 10,
+    "koniq": 1,
+    "paq2piq": 1
+}
+
+# Padded sequence lengths of the forward pass, in ~1.5x steps. The 224 and
+# 384 scales always give 193 tokens; the original resolution adds the rest
+# (about 11k for a 12 MP photo). Longer sequences are rounded up to a
+# multiple of the largest bucket.
+SEQUENCE_BUCKETS = (256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096, 6144, 8192, 12288, 16384)
+
+# Upper bound on batch size x bucket length of one forward pass, so long
+# sequences are not batched into one huge attention computation
+MAX_BATCH_TOKENS = 16384
+
+# Maximum number of images packed into one row (number of CLS tokens per row)
+MAX_SEGMENTS = 8
+
+
+def bucket_length(seq_len: int, buckets: Sequence[int] = SEQUENCE_BUCKETS) -> int:
+    """Padded length for a sequence: the smallest bucket that fits it."""
+    for length in buckets:
+        if seq_len <= length:
+            return length
+    return -(-seq_len // buckets[-1]) * buckets[-1]
+
+
+def plan_batches(lengths: List[int], max_batch_size: int, buckets: Optional[Sequence[int]] = SEQUENCE_BUCKETS,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS) -> List[Tuple[int, List[int]]]:
+    """Group sequences by bucket into forward passes; returns (padded length, indices) per pass.
+    
+    Without `buckets`, all sequences form one pass padded to the longest.
+    """
+    if not buckets:
+        return [(max(lengths), list(range(len(lengths))))]
+    groups = {}
+    for i, seq_len in enumerate(lengths):
+        groups.setdefault(bucket_length(seq_len, buckets), []).append(i)
+    plan = []
+    for length in sorted(groups):
+        per_pass = max(1, min(max_batch_size, max_batch_tokens // length))
+        indices = groups[length]
+        plan.extend((length, indices[start:start + per_pass]) for start in range(0, len(indices), per_pass))
+    return plan
+
+
+def padded_batch_size(n: int, buckets: Optional[Sequence[int]] = SEQUENCE_BUCKETS) -> int:
+    """Rows of a forward pass for n sequences: the next power of two when bucketing."""
+    return 1 << (n - 1).bit_length() if buckets else n
+
+
+class NpzMusiqModel:
+    """A MUSIQ .npz checkpoint with its preprocessing and a jit-compiled forward pass."""
+    
+    def __init__(self, checkpoint_path: str, num_classes: int = 1, preprocess_engine: str = "tf",
+                 buckets: Optional[Sequence[int]] = SEQUENCE_BUCKETS, max_batch_size: int = 8,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS, pack_length: Optional[int] = None,
+                 max_segments: int = MAX_SEGMENTS):
+        if preprocess_engine not in ("tf", "numpy"):
+            raise ValueError(f"Unknown preprocess engine: {preprocess_engine}")
+        self.checkpoint_path = checkpoint_path
+        self.num_classes = num_classes
+        self.preprocess_engine = preprocess_engine
+        self.model_config, self.pp_config, self.params = get_params_and_config(checkpoint_path)
+        self._preprocess_fn = pp_lib.get_preprocess_fn(**self.pp_config)
+        # Compiled once per input shape (batch size, sequence length)
+        self._forward = get_batched_predict_fn(self.model_config, num_classes)
+        # Same, for rows of up to max_segments packed sequences
+        self._packed_forward = get_batched_predict_fn(self.model_config, num_classes, max_segments)
+        
+        # Sequence-length buckets (None: pad each batch to its longest sequence)
+        self.buckets = tuple(sorted(buckets)) if buckets else None
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        
+        # Row length of packed sequences (None: no packing)
+        self.pack_length = pack_length
+        self.max_segments = max_segments
+        
+        # Real vs. padded tokens and attention cost (sum of length^2), and the
+        # input shapes compiled so far
+        self.stats = {"sequences": 0, "passes": 0, "tokens": 0, "padded_tokens": 0,
+                      "attention": 0, "padded_attention": 0, "compiles": 0}
+        self._shapes = set()
+        self._stats_lock = threading.Lock()
+    
+    @classmethod
+    def for_model(cls, model_name: str, checkpoint_path: str, preprocess_engine: str = "tf",
+                  **kwargs) -> "NpzMusiqModel":
+        """Load the checkpoint of a named MUSIQ variant (spaq, ava, koniq, paq2piq)."""
+        return cls(checkpoint_path, CHECKPOINT_NUM_CLASSES.get(model_name, 1), preprocess_engine, **kwargs)
+    
+    def preprocess(self, image_bytes: bytes) -> np.ndarray:
+        """Decode an encoded image into its multi-scale patch sequence, shape (seq_len, dim)."""
+        with tf.device('/CPU:0'):
+            if self.preprocess_engine == "tf":
+                return self._preprocess_fn({"image": tf.constant(image_bytes)})["image"].numpy()
+            # Same decoder as the TF graph, so both engines see identical pixels
+            image = pp_lib.decode_image(tf.constant(image_bytes)).numpy()
+        return numpy_preprocessing.get_multiscale_patches(image, **self.pp_config)
+    
+    def predict_patches(self, patches: np.ndarray) -> np.ndarray:
+        """Score preprocessed patch sequences, shape (batch, seq_len, dim); returns one score per row."""
+        return np.asarray(self._forward(self.params, patches))
+    
+    def predict_sequences(self, sequences: List[np.ndarray]) -> np.ndarray:
+        """Score preprocessed sequences of any lengths.
+        
+        Sequences that fit pack_length are packed (see _predict_packed), the
+        others padded to their bucket length (see _predict_padded).
+        """
+        # Unmasked patches; the 224 and 384 scales are padded to fixed lengths
+        real_lengths = [int(np.count_nonzero(sequence[:, -1])) for sequence in sequences]
+        fits = [bool(self.pack_length) and real_length <= self.pack_length for real_length in real_lengths]
+        packed = [i for i, fit in enumerate(fits) if fit]
+        padded = [i for i, fit in enumerate(fits) if not fit]
+        
+        scores = np.zeros(len(sequences), dtype=np.float32)
+        for indices, predict in ((packed, self._predict_packed), (padded, self._predict_padded)):
+            if indices:
+                scores[indices] = predict([sequences[i] for i in indices], [real_lengths[i] for i in indices])
+        return scores
+    
+    def _predict_padded(self, sequences: List[np.ndarray], real_lengths: List[int]) -> np.ndarray:
+        """Score sequences one per row, one forward pass per bucket group.
+        
+        Sequences are zero-padded to their bucket length and each pass to a
+        power-of-two number of rows; padding has input mask 0 (the last
+        column), so attention ignores it like the preprocessing's own padding.
+        """
+        lengths = [sequence.shape[0] for sequence in sequences]
+        scores = np.zeros(len(sequences), dtype=np.float32)
+        for length, indices in plan_batches(lengths, self.max_batch_size, self.buckets, self.max_batch_tokens):
+            rows = padded_batch_size(len(indices), self.buckets)
+            batch = stack_sequences([sequences[i] for i in indices], length, rows)
+            self._record(batch.shape, [real_lengths[i] for i in indices])
+            scores[indices] = self.predict_patches(batch)[:len(indices)]
+        return scores
+    
+    def _predict_packed(self, sequences: List[np.ndarray], real_lengths: List[int]) -> np.ndarray:
+        """Score sequences packed up to max_segments per row of pack_length patches.
+        
+        Attention is still computed densely over each row, but the
+        block-diagonal mask keeps segments apart, so the scores equal those of
+        unpacked rows while far fewer padding tokens go through the model.
+        """
+        batch, placements = pack_sequences(sequences, self.pack_length, self.max_segments)
+        segment_lengths = [[] for _ in range(batch.shape[0])]
+        for (row, _), real_length in zip(placements, real_lengths):
+            segment_lengths[row].append(real_length)
+        
+        rows_per_pass = max(1, self.max_batch_tokens // self.pack_length)
+        row_scores = np.zeros((batch.shape[0], self.max_segments), dtype=np.float32)
+        for start in range(0, batch.shape[0], rows_per_pass):
+            rows = batch[start:start + rows_per_pass]
+            n = rows.shape[0]
+            padding = padded_batch_size(n, self.buckets) - n
+            if padding:
+                rows = np.concatenate([rows, np.zeros((padding,) + rows.shape[1:], dtype=rows.dtype)])
+            self._record(rows.shape, sum(segment_lengths[start:start + n], []), packed=True)
+            row_scores[start:start + n] = np.asarray(self._packed_forward(self.params, rows))[:n]
+        return np.array([row_scores[row, segment] for row, segment in placements], dtype=np.float32)
+    
+    def _record(self, shape: Tuple[int, ...], lengths: List[int], packed: bool = False):
+        """Count a forward pass of `shape` for sequences of `lengths` unmasked patches."""
+        rows, length = shape[0], shape[1]
+        with self._stats_lock:
+            self.stats["sequences"] += len(lengths)
+            self.stats["passes"] += 1
+            self.stats["tokens"] += sum(lengths)
+            self.stats["padded_tokens"] += rows * length
+            self.stats["attention"] += sum(seq_len * seq_len for seq_len in lengths)
+            self.stats["padded_attention"] += rows * length * length
+            if (packed,) + shape not in self._shapes:
+                self._shapes.add((packed,) + shape)
+                self.stats["compiles"] += 1
+    
+    def padding_report(self) -> Dict[str, float]:
+        """Share of computed tokens and attention cost spent on padding, plus pass and compile counts."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        
+        def overhead(real: int, padded: int) -> Optional[float]:
+            return round(1.0 - real / padded, 4) if padded else None
+        
+        return {
+            "sequences": stats["sequences"],
+            "passes": stats["passes"],
+            "compiles": stats["compiles"],
+            "token_padding": overhead(stats["tokens"], stats["padded_tokens"]),
+            "attention_padding": overhead(stats["attention"], stats["padded_attention"])
+        }
+    
+    def predict(self, image_bytes: bytes) -> float:
+        """Score one encoded image."""
+        return float(self.predict_sequences([self.preprocess(image_bytes)])[0])
+    
+    def predict_batch(self, images: List[bytes]) -> np.ndarray:
+        """Score several encoded images, batched by sequence-length bucket or packed."""
+        return self.predict_sequences([self.preprocess(image_bytes) for image_bytes in images])
+
+
+def measure_throughput(model: NpzMusiqModel, sequences: List[np.ndarray], batch_sizes: List[int],
+                       repeat: int = 3) -> List[Dict[str, float]]:
+    """Time the batched forward pass for each batch size.
+    
+    Each batch cycles through the preprocessed `sequences`. The first call of
+    a batch size compiles and is reported separately; the forward time is the
+    median of `repeat` further calls. Padding is the share of masked tokens.
+    """
+    report = []
+    for batch_size in batch_sizes:
+        batch = stack_sequences([sequences[i % len(sequences)] for i in range(batch_size)])
+        start = time.perf_counter()
+        model.predict_patches(batch)
+        compile_seconds = time.perf_counter() - start
+        
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model.predict_patches(batch)
+            times.append(time.perf_counter() - start)
+        seconds = statistics.median(times)
+        report.append({
+            "batch_size": batch_size,
+            "seq_len": batch.shape[1],
+            "padding": 1.0 - float(batch[:, :, -1].mean()),
+            "compile_seconds": compile_seconds,
+            "batch_seconds": seconds,
+            "images_per_second": batch_size / seconds
+        })
+    return report
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Score an image with a MUSIQ .npz checkpoint using the native JAX model",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python musiq_jax_backend.py --image sample.jpg --checkpoint musiq_original/checkpoints/spaq_ckpt.npz
+  python musiq_jax_backend.py --image sample.jpg --checkpoint musiq_original/checkpoints/ava_ckpt.npz --model ava
+  python musiq_jax_backend.py --image a.jpg b.jpg c.jpg --checkpoint musiq_original/checkpoints/spaq_ckpt.npz
+  python musiq_jax_backend.py --image *.jpg --checkpoint musiq_original/checkpoints/spaq_ckpt.npz --batch-sizes 1 2 4 8 16
+  python musiq_jax_backend.py --image *.jpg --checkpoint musiq_original/checkpoints/spaq_ckpt.npz --pack-length 1024
+
+Several images are scored as one batch. With --batch-sizes, the throughput of
+the batched forward pass is reported for each batch size instead.
+        """
+    )
+    
+    parser.add_argument('--image', nargs='+', required=True, help='Path(s) to input image(s)')
+    parser.add_argument('--checkpoint', required=True, help='Path to the .npz checkpoint')
+    parser.add_argument('--model', choices=list(CHECKPOINT_NUM_CLASSES.keys()),
+                       help='Checkpoint variant (default: inferred from the file name)')
+    parser.add_argument('--preprocess', choices=['tf', 'numpy'], default='tf',
+                       help='Patch extraction engine: the original TF graph or NumPy (default: tf)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                       help='Report forward-pass throughput for these batch sizes')
+    parser.add_argument('--repeat', type=int, default=3,
+                       help='With --batch-sizes: timed calls per batch size (default: 3)')
+    parser.add_argument('--max-batch-size', type=int, default=8,
+                       help='Maximum images per forward pass (default: 8)')
+    parser.add_argument('--no-buckets', action='store_true',
+                       help='Pad each batch to its longest sequence instead of to sequence-length buckets')
+    parser.add_argument('--pack-length', type=int,
+                       help='Pack images of at most this many patches several to a row (e.g. 1024)')
+    parser.add_argument('--max-segments', type=int, default=MAX_SEGMENTS,
+                       help=f'With --pack-length: maximum images per packed row (default: {MAX_SEGMENTS})')
+    
+    args = parser.parse_args()
+    
+    for path in args.image + [args.checkpoint]:
+        if not os.path.exists(path):
+            print(f"Error: File not found: {path}")
+            sys.exit(1)
+    
+    model_name = args.model or os.path.basename(args.checkpoint).split('_')[0]
+    
+    start = time.perf_counter()
+    model = NpzMusiqModel.for_model(model_name, args.checkpoint, args.preprocess,
+                                    buckets=None if args.no_buckets else SEQUENCE_BUCKETS,
+                                    max_batch_size=args.max_batch_size, pack_length=args.pack_length,
+                                    max_segments=args.max_segments)
+    print(f"Loaded {args.checkpoint} in {time.perf_counter() - start:.2f}s")
+    
+    images = []
+    for image_path in args.image:
+        with open(image_path, 'rb') as f:
+            images.append(f.read())
+    
+    if args.batch_sizes:
+        sequences = [model.preprocess(image_bytes) for image_bytes in images]
+        print(f"{'batch':>5}  {'seq len':>7}  {'padding':>7}  {'compile s':>9}  {'batch ms':>9}  {'images/s':>8}")
+        for row in measure_throughput(model, sequences, args.batch_sizes, args.repeat):
+            print(f"{row['batch_size']:>5}  {row['seq_len']:>7}  {row['padding']:>7.1%}  "
+                  f"{row['compile_seconds']:>9.2f}  {row['batch_seconds'] * 1000:>9.1f}  "
+                  f"{row['images_per_second']:>8.2f}")
+    elif len(images) > 1:
+        start = time.perf_counter()
+        scores = model.predict_batch(images)
+        print(f"Scored {len(images)} images in one batch in {time.perf_counter() - start:.2f}s")
+        for image_path, score in zip(args.image, scores):
+            print(f"{image_path}: {model_name.upper()} score {score:.4f}")
+        report = model.padding_report()
+        print(f"{report['passes']} forward passes, {report['compiles']} compiled shapes, "
+              f"padding: {report['token_padding']:.1%} of tokens, {report['attention_padding']:.1%} of attention")
+    else:
+        # The first call includes jit compilation for this input shape
+        for label in ("first call", "second call"):
+            start = time.perf_counter()
+            score = model.predict(images[0])
+            print(f"{model_name.upper()} score: {score:.4f} ({label}: {time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
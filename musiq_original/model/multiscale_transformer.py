@@ -19,8 +19,8 @@ from flax import nn
 import jax.numpy as jnp
 import numpy as np
 
-import musiq.model.multiscale_transformer_utils as utils
-import musiq.model.resnet as resnet
+from . import multiscale_transformer_utils as utils
+from . import resnet
 
 RESNET_TOKEN_DIM = 64
 
@@ -35,20 +35,26 @@ class Model(nn.Module):
             hidden_size=None,
             transformer=None,
             resnet_emb=None,
-            representation_size=None):
+            representation_size=None,
+            num_segments=None):
     """Apply model on inputs.
 
     Args:
-      x: the processed input patches and position annotations.
+      x: the processed input patches and position annotations. For packed
+        sequences the last (input mask) channel holds the segment id of each
+        patch, 1..num_segments, and 0 for padding.
       num_classes: the number of output classes. 1 for single model.
       train: train or eval.
       hidden_size: the hidden dimension for patch embedding tokens.
       transformer: the model config for Transformer backbone.
       resnet_emb: the config for patch embedding w/ small resnet.
       representation_size: size of the last FC before prediction.
+      num_segments: if set, x holds packed sequences of up to num_segments
+        images each.
 
     Returns:
-      Model prediction output.
+      Model prediction output; `(batch size, num_segments, num_classes)` for
+      packed sequences.
     """
     assert transformer is not None
     # Either 3: (batch size, seq len, channel) or
@@ -57,6 +63,7 @@ class Model(nn.Module):
 
     multi_crops_input = False
     if len(x.shape) == 4:
+      assert num_segments is None
       multi_crops_input = True
       batch_size, num_crops, l, channel = x.shape
       x = jnp.reshape(x, [batch_size * num_crops, l, channel])
@@ -68,6 +75,9 @@ class Model(nn.Module):
     inputs_scale_positions = x[:, :, -2]
     inputs_scale_positions = inputs_scale_positions.astype(jnp.int32)
     inputs_masks = x[:, :, -1]
+    inputs_segment_ids = None
+    if num_segments:
+      inputs_segment_ids = inputs_masks.astype(jnp.int32)
     inputs_masks = inputs_masks.astype(jnp.bool_)
     x = x[:, :, :-3]
     n, l, channel = x.shape
@@ -112,9 +122,11 @@ class Model(nn.Module):
         inputs_masks,
         train=train,
         name="Transformer",
+        inputs_segment_ids=inputs_segment_ids,
+        num_segments=num_segments or 1,
         **transformer)
 
-    x = x[:, 0]
+    x = x[:, :num_segments] if num_segments else x[:, 0]
 
     if representation_size:
       x = nn.Dense(x, representation_size, name="pre_logits")
@@ -19,8 +19,10 @@ import jax
 import jax.numpy as jnp
 import numpy as np
 
+from . import position_tables
+
 # Maximum frequency-scale in sine grating.
-SINE_MAX_SCALE = 10000
+SINE_MAX_SCALE = position_tables.SINE_MAX_SCALE
 
 
 def get_sinusoid_encoding(n_position, hidden_size):
@@ -31,21 +33,9 @@ def get_sinusoid_encoding(n_position, hidden_size):
     hidden_size: the hidden dimension for the encoding table.
 
   Returns:
-    The sinusoid_table
+    The sinusoid_table (memoized and read-only, see position_tables).
   """
-
-  def get_position_angle_vec(position):
-    return [
-        position / np.power(SINE_MAX_SCALE, 2 * (hid_j // 2) / hidden_size)
-        for hid_j in range(hidden_size)
-    ]
-
-  sinusoid_table = np.array(
-      [get_position_angle_vec(pos_i) for pos_i in range(n_position)])
-  sinusoid_table[:, 0::2] = np.sin(sinusoid_table[:, 0::2])  # dim 2i
-  sinusoid_table[:, 1::2] = np.cos(sinusoid_table[:, 1::2])  # dim 2i+1
-
-  return sinusoid_table
+  return position_tables.get_sinusoid_encoding(n_position, hidden_size)
 
 
 class AddHashSpatialPositionEmbs(nn.Module):
@@ -161,6 +151,7 @@ class Encoder1DBlock(nn.Module):
             attention_dropout_rate=0.1,
             deterministic=True,
             layer_drop_p=None,
+            inputs_segment_ids=None,
             **attention_kwargs):
     """Applies Encoder1DBlock module.
 
@@ -173,6 +164,8 @@ class Encoder1DBlock(nn.Module):
       attention_dropout_rate: dropout for attention heads.
       deterministic: bool, deterministic or not (to apply dropout).
       layer_drop_p: probability of dropping a layer.
+      inputs_segment_ids: int, segment id of each token for packed sequences;
+        tokens only attend to tokens of the same segment.
       **attention_kwargs: kwargs passed to nn.SelfAttention
 
     Returns:
@@ -189,6 +182,7 @@ class Encoder1DBlock(nn.Module):
         attention_axis=(1,),
         causal_mask=False,
         padding_mask=inputs_masks,
+        segmentation=inputs_segment_ids,
         kernel_init=nn.initializers.xavier_uniform(),
         broadcast_dropout=False,
         deterministic=deterministic,
@@ -230,9 +224,16 @@ class Encoder(nn.Module):
             train=False,
             dtype=jnp.float32,
             stochastic_layer_drop_rate=0.0,
+            inputs_segment_ids=None,
+            num_segments=1,
             **attention_kwargs):
     """Applies Transformer model on the inputs.
 
+    Several images can be packed into one sequence: token t then belongs to
+    image inputs_segment_ids[t] (1..num_segments, 0 for padding), attention
+    is block-diagonal over segments, and each segment gets its own CLS token
+    at position segment - 1 of the output.
+
     Args:
       inputs: input data
       inputs_spatial_positions: input spatial positions for each embedding.
@@ -251,10 +252,15 @@ class Encoder(nn.Module):
         from 0 to the provided value. Our implementation of stochastic depth
         follows timm library, which does per-example layer dropping and uses
         independent dropping patterns for each skip-connection.
+      inputs_segment_ids: int, segment id of each token for packed sequences,
+        or None for one image per sequence.
+      num_segments: number of CLS tokens, i.e. the maximum number of packed
+        segments per sequence.
       **attention_kwargs: kwargs passed to nn.SelfAttention
 
     Returns:
-      output of a transformer encoder.
+      output of a transformer encoder; its first num_segments tokens are the
+      CLS tokens.
     """
     assert inputs.ndim == 3  # (batch, len, emb)
     dtype = jax.dtypes.canonicalize_dtype(dtype)
@@ -283,12 +289,19 @@ class Encoder(nn.Module):
 
     n, _, c = x.shape
     cls = self.param("cls", (1, 1, c), nn.initializers.zeros)
-    cls = jnp.tile(cls, [n, 1, 1])
+    cls = jnp.tile(cls, [n, num_segments, 1])
     x = jnp.concatenate([cls, x], axis=1)
 
-    cls_mask = jnp.ones((n, 1), dtype=inputs_masks.dtype)
+    cls_mask = jnp.ones((n, num_segments), dtype=inputs_masks.dtype)
     inputs_masks = jnp.concatenate([cls_mask, inputs_masks], axis=1)
 
+    if inputs_segment_ids is not None:
+      cls_segment_ids = jnp.arange(
+          1, num_segments + 1, dtype=inputs_segment_ids.dtype)
+      cls_segment_ids = jnp.tile(cls_segment_ids[jnp.newaxis], [n, 1])
+      inputs_segment_ids = jnp.concatenate(
+          [cls_segment_ids, inputs_segment_ids], axis=1)
+
     x = nn.dropout(x, rate=dropout_rate, deterministic=not train)
 
     # Input Encoder
@@ -303,6 +316,7 @@ class Encoder(nn.Module):
           name=f"encoderblock_{lyr}",
           dtype=dtype,
           layer_drop_p=layer_drop_p,
+          inputs_segment_ids=inputs_segment_ids,
           **attention_kwargs)
     encoded = nn.LayerNorm(x, name="encoder_norm")
 
@@ -0,0 +1,137 @@
+# coding=utf-8
+# Copyright 2025 The Google Research Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memoized position tables for Multiscale Transformer.
+
+The hashed spatial position index of a patch grid depends only on
+(grid_size, count_h, count_w) and the sinusoid encoding table only on
+(n_position, hidden_size), so both are built once with vectorized NumPy and
+kept in LRU-bounded caches. The resized scales (224, 384) only produce a few
+patch grids, which `precompute_hashed_spatial_pos_emb_index` builds up front;
+original-resolution grids are built on their first miss.
+
+Returned arrays are shared between callers and therefore read-only.
+"""
+
+import functools
+import math
+
+import numpy as np
+
+# Maximum frequency-scale in sine grating.
+SINE_MAX_SCALE = 10000
+
+# Maximum number of cached tables of each kind.
+MAX_CACHED_TABLES = 256
+
+
+def _read_only(x):
+  x.setflags(write=False)
+  return x
+
+
+def _nearest_neighbor_index(in_size, out_size):
+  """Source index of each output of a legacy nearest-neighbor resize.
+
+  Matches tf.image.resize(method=NEAREST_NEIGHBOR) without half-pixel
+  centers: floor(i * in_size / out_size) in float32, clamped to in_size - 1.
+
+  Args:
+    in_size: input length.
+    out_size: output length.
+
+  Returns:
+    int64 array of shape (out_size,).
+  """
+  scale = np.float32(in_size) / np.float32(out_size)
+  index = np.floor(np.arange(out_size, dtype=np.float32) * scale)
+  return np.minimum(index.astype(np.int64), in_size - 1)
+
+
+@functools.lru_cache(maxsize=MAX_CACHED_TABLES)
+def get_hashed_spatial_pos_emb_index(grid_size, count_h, count_w):
+  """Hashed spatial position index of each patch of a count_h x count_w grid.
+
+  Same values as preprocessing.get_hashed_spatial_pos_emb_index: the grid is
+  hashed to grid_size x grid_size by nearest-neighbor resizing.
+
+  Args:
+    grid_size: grid size G for the hashed-based spatial positional embedding.
+    count_h: number of patches in each column of the image.
+    count_w: number of patches in each row of the image.
+
+  Returns:
+    Read-only float32 array of shape (count_h * count_w,) with values in
+    [0, grid_size x grid_size).
+  """
+  pos_h = _nearest_neighbor_index(grid_size, count_h)
+  pos_w = _nearest_neighbor_index(grid_size, count_w)
+  pos = pos_h[:, np.newaxis] * grid_size + pos_w[np.newaxis, :]
+  return _read_only(pos.reshape(-1).astype(np.float32))
+
+
+def precompute_hashed_spatial_pos_emb_index(grid_size, patch_stride,
+                                            longer_side_lengths):
+  """Builds the index tables of every patch grid the resized scales can have.
+
+  After aspect-ratio-preserving resizing the longer side spans
+  ceil(longer_side_length / patch_stride) patches and the shorter side at
+  most as many, so each scale has only a handful of possible grids.
+
+  Args:
+    grid_size: grid size for the hashed-based spatial positional embedding.
+    patch_stride: patch stride.
+    longer_side_lengths: longer-side lengths of the resized scales.
+  """
+  for longer_size in longer_side_lengths:
+    longer_count = math.ceil(longer_size / patch_stride)
+    for shorter_count in range(1, longer_count + 1):
+      get_hashed_spatial_pos_emb_index(grid_size, longer_count, shorter_count)
+      get_hashed_spatial_pos_emb_index(grid_size, shorter_count, longer_count)
+
+
+@functools.lru_cache(maxsize=MAX_CACHED_TABLES)
+def get_sinusoid_encoding(n_position, hidden_size):
+  """Sinusoid position encoding table.
+
+  Args:
+    n_position: the number of total positions.
+    hidden_size: the hidden dimension for the encoding table.
+
+  Returns:
+    Read-only float64 table of shape (n_position, hidden_size).
+  """
+  exponents = 2 * (np.arange(hidden_size) // 2) / hidden_size
+  table = (np.arange(n_position, dtype=np.float64)[:, np.newaxis] /
+           np.power(SINE_MAX_SCALE, exponents)[np.newaxis, :])
+  table[:, 0::2] = np.sin(table[:, 0::2])  # dim 2i
+  table[:, 1::2] = np.cos(table[:, 1::2])  # dim 2i+1
+  return _read_only(table)
+
+
+def cache_info():
+  """Returns the functools cache statistics of both table caches."""
+  return {
+      'hashed_spatial_pos_emb_index':
+          get_hashed_spatial_pos_emb_index.cache_info(),
+      'sinusoid_encoding': get_sinusoid_encoding.cache_info(),
+  }
+
+
+def clear_caches():
+  """Drops all cached tables."""
+  get_hashed_spatial_pos_emb_index.cache_clear()
+  get_sinusoid_encoding.cache_clear()
+
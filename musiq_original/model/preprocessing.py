@@ -21,6 +21,8 @@ import numpy as np
 import tensorflow.compat.v1 as tf
 import tensorflow.compat.v2 as tf2
 
+from . import position_tables
+
 
 def _ceil_divide_int(x,
                      y):
@@ -103,6 +105,14 @@ def get_hashed_spatial_pos_emb_index(grid_size, count_h,
     position index in [0, grid_size x grid_size).
 
   """
+  # Known patch counts (eager mode): use the memoized table.
+  static_h = tf.get_static_value(count_h)
+  static_w = tf.get_static_value(count_w)
+  if static_h is not None and static_w is not None:
+    pos_emb_hash = position_tables.get_hashed_spatial_pos_emb_index(
+        grid_size, int(static_h), int(static_w))
+    return tf.constant(pos_emb_hash.reshape(-1, 1))
+
   pos_emb_grid = tf.range(grid_size, dtype=tf.int32)
   pos_emb_grid = tf.reshape(pos_emb_grid, [grid_size, 1, 1])
   pos_emb_hash_w = tf.image.resize(
@@ -318,6 +328,10 @@ def get_preprocess_fn(**preprocessing_kwargs):
   Raises:
     ValueError: if input data
   """
+  position_tables.precompute_hashed_spatial_pos_emb_index(
+      preprocessing_kwargs['hse_grid_size'],
+      preprocessing_kwargs['patch_stride'],
+      preprocessing_kwargs.get('longer_side_lengths', []))
 
   def _preprocess_fn(data):
     """The preprocessing function that is returned."""
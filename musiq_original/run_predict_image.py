@@ -27,13 +27,16 @@ import ml_collections
 import numpy as np
 import tensorflow.compat.v1 as tf
 
-import musiq.model.multiscale_transformer as model_mod
-import musiq.model.preprocessing as pp_lib
+import musiq_original.model.multiscale_transformer as model_mod
+import musiq_original.model.preprocessing as pp_lib
 
 FLAGS = flags.FLAGS
 
 flags.DEFINE_string('ckpt_path', '', 'Path to checkpoint.')
 flags.DEFINE_string('image_path', '', 'Path to input image.')
+flags.DEFINE_list(
+    'image_paths', [],
+    'Comma-separated input image paths, scored together as one batch.')
 flags.DEFINE_integer(
     'num_classes', 1,
     'Number of scores to predict. 10 for AVA and 1 for the other datasets.')
@@ -154,6 +157,129 @@ def run_model_single_image(model_config, num_classes, pp_config, params,
   return preds[0]
 
 
+def stack_sequences(sequences, length=None, batch_size=None):
+  """Stacks patch sequences of different lengths into one zero-padded batch.
+
+  Padded positions are all zeros, so their input mask (the last channel) is
+  0 and attention ignores them, like the padding added in preprocessing.
+
+  Args:
+    sequences: list of arrays of shape (length_i, dim).
+    length: padded sequence length (default: max(length_i)).
+    batch_size: padded number of rows (default: len(sequences)); extra rows
+      are fully masked.
+
+  Returns:
+    Array of shape (batch_size, length, dim).
+  """
+  length = length or max(sequence.shape[0] for sequence in sequences)
+  batch = np.zeros((batch_size or len(sequences), length,
+                    sequences[0].shape[-1]),
+                   dtype=sequences[0].dtype)
+  for i, sequence in enumerate(sequences):
+    batch[i, :sequence.shape[0]] = sequence
+  return batch
+
+
+def pack_sequences(sequences, length, num_segments, batch_size=None):
+  """Packs several patch sequences into each row of a zero-padded batch.
+
+  Only the unmasked patches of each sequence are kept (padding patches are
+  ignored by attention anyway), and rows are filled first-fit, longest
+  sequence first. The input mask channel of a packed patch holds its
+  segment id (1..num_segments); padding stays 0.
+
+  Args:
+    sequences: list of arrays of shape (length_i, dim).
+    length: row length; each sequence must have at most `length` unmasked
+      patches.
+    num_segments: maximum number of sequences per row.
+    batch_size: minimum number of rows; extra rows are fully masked.
+
+  Returns:
+    Tuple of the packed array of shape (rows, length, dim) and a list of
+    (row, segment index) for each sequence.
+  """
+  patches = [sequence[sequence[:, -1] > 0] for sequence in sequences]
+  order = sorted(range(len(patches)), key=lambda i: -patches[i].shape[0])
+  rows = []  # [used length, number of segments] of each row
+  placements = [None] * len(patches)
+  for i in order:
+    count = patches[i].shape[0]
+    if count > length:
+      raise ValueError(f'Sequence of {count} patches does not fit rows of '
+                       f'length {length}.')
+    row = next((r for r, (used, segments) in enumerate(rows)
+                if used + count <= length and segments < num_segments), None)
+    if row is None:
+      row = len(rows)
+      rows.append([0, 0])
+    placements[i] = (row, rows[row][1], rows[row][0])
+    rows[row][0] += count
+    rows[row][1] += 1
+
+  batch = np.zeros((max(len(rows), batch_size or 0), length,
+                    sequences[0].shape[-1]),
+                   dtype=sequences[0].dtype)
+  for i, (row, segment, start) in enumerate(placements):
+    batch[row, start:start + patches[i].shape[0]] = patches[i]
+    batch[row, start:start + patches[i].shape[0], -1] = segment + 1
+  return batch, [(row, segment) for row, segment, _ in placements]
+
+
+def get_batched_predict_fn(model_config, num_classes, num_segments=None):
+  """Returns a jitted fn(params, batch) -> one MOS score per batch row.
+
+  Args:
+    model_config: the parameters used in building the model backbone.
+    num_classes: number of outputs. 1 for single mos prediction.
+    num_segments: if set, the batch holds packed sequences (see
+      pack_sequences) and the function returns (batch, num_segments) scores.
+
+  Returns:
+    Jitted function of params and a (batch, length, dim) input array. It is
+    compiled once per input shape; params are traced arguments, not
+    constants baked into the executable.
+  """
+  model = model_mod.Model.partial(
+      num_classes=num_classes, train=False, num_segments=num_segments,
+      **model_config)
+  score_values = jnp.arange(1, num_classes + 1, dtype=np.float32)
+
+  def predict(params, batch):
+    logits = model.call(params, batch)
+    preds = logits
+    if num_classes > 1:
+      preds = jax.nn.softmax(logits)
+    return jnp.sum(preds * score_values, axis=-1)
+
+  return jax.jit(predict)
+
+
+def run_model_batch(model_config, num_classes, pp_config, params,
+                    image_paths):
+  """Runs the model on several images as one batch.
+
+  Args:
+    model_config: the parameters used in building the model backbone.
+    num_classes: number of outputs. 1 for single mos prediction.
+    pp_config: image preprocessing config.
+    params: model parameters loaded from checkpoint.
+    image_paths: input image paths.
+
+  Returns:
+    Model predictions for MOS score, one per image.
+  """
+  pp_fn = pp_lib.get_preprocess_fn(**pp_config)
+  sequences = []
+  for image_path in image_paths:
+    with tf.compat.v1.gfile.FastGFile(image_path, 'rb') as f:
+      data = pp_fn(dict(image=tf.constant(f.read())))
+    sequences.append(data['image'].numpy())
+  predict = get_batched_predict_fn(model_config, num_classes)
+  return np.asarray(predict(params, stack_sequences(sequences)))
+
+
 def get_params_and_config(ckpt_path):
   """Returns (model config, preprocessing config, model params from ckpt)."""
   model_config = ml_collections.ConfigDict(_MODEL_CONFIG)
@@ -172,6 +298,12 @@ def get_params_and_config(ckpt_path):
 
 def main(_):
   model_config, pp_config, params = get_params_and_config(FLAGS.ckpt_path)
+  if FLAGS.image_paths:
+    pred_mos = run_model_batch(model_config, FLAGS.num_classes, pp_config,
+                               params, FLAGS.image_paths)
+    for image_path, mos in zip(FLAGS.image_paths, pred_mos):
+      print('============== Precited MOS:', image_path, mos)
+    return
   pred_mos = run_model_single_image(model_config, FLAGS.num_classes, pp_config,
                                     params, FLAGS.image_path)
   print('============== Precited MOS:', pred_mos)
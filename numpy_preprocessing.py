@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+NumPy multi-scale patch extraction for the native MUSIQ models.
+
+A NumPy port of musiq_original/model/preprocessing.get_multiscale_patches.
+The TF graph extracts patches with tf.image.extract_patches, concatenates the
+position, scale and mask columns, pads with a zero concat and slices, which
+copies the patch tensor several times. Here every scale is resized (Gaussian
+kernel, same spans and weights as tf.image.resize) straight into a zero
+padded canvas, the patch grid is a stride-tricks view of that canvas, and the
+patches are copied once into a single preallocated (seq_len, p*p*3 + 3)
+buffer whose padding rows stay zero (input mask 0).
+
+With pyramid=True each smaller scale is resized from the next larger one
+(384 from full resolution, 224 from 384) instead of from full resolution.
+That is cheaper on large images but no longer matches the TF output exactly.
+"""
+
+import argparse
+import io
+import math
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from PIL import Image
+
+from musiq_original.model.position_tables import get_hashed_spatial_pos_emb_index
+
+
+# Radius of tf.image.resize's Gaussian kernel (sigma = radius / 3)
+GAUSSIAN_RADIUS = 1.5
+
+
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    """Decode an encoded image into a uint8 RGB array (h, w, 3) with Pillow.
+    
+    Pillow's JPEG decoder may round a few pixels differently from
+    tf.image.decode_jpeg; decode with TF when bit-identical input matters.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def normalize_image(image: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Scale a uint8 image to [-1, 1] float32 (as preprocessing.normalize_value_range), into `out` if given."""
+    out = np.divide(image, np.float32(255.0), out=out, dtype=np.float32)
+    out *= np.float32(2.0)
+    out -= np.float32(1.0)
+    return out
+
+
+def resized_shape(h: int, w: int, longer_side_length: int) -> Tuple[int, int]:
+    """Height and width after aspect-ratio-preserving resizing (rounded like the TF graph)."""
+    ratio = np.float32(longer_side_length) / np.float32(max(h, w))
+    return int(np.round(np.float32(h) * ratio)), int(np.round(np.float32(w) * ratio))
+
+
+def resize_spans(input_size: int, output_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Source indices and weights, each (output_size, span), of TF's non-antialiased Gaussian resize."""
+    scale = np.float32(output_size) / np.float32(input_size)
+    inv_scale = np.float32(1.0 / float(scale))
+    radius = np.float32(GAUSSIAN_RADIUS)
+    span_size = min(2 * math.ceil(GAUSSIAN_RADIUS) + 1, input_size)
+    
+    sample = (np.arange(output_size, dtype=np.float32) + np.float32(0.5)) * inv_scale
+    starts = np.clip(np.ceil(sample - radius - np.float32(0.5)).astype(np.int64), 0, input_size - 1)
+    ends = np.clip(np.floor(sample + radius - np.float32(0.5)).astype(np.int64), 0, input_size - 1) + 1
+    sources = starts[:, np.newaxis] + np.arange(span_size)
+    
+    distance = np.abs(sources.astype(np.float32) + np.float32(0.5) - sample[:, np.newaxis])
+    sigma = GAUSSIAN_RADIUS / 3.0
+    weights = np.exp(-(distance * distance).astype(np.float64) / (2.0 * sigma * sigma)).astype(np.float32)
+    weights[(distance >= radius) | (sources >= ends[:, np.newaxis])] = 0.0
+    weights *= np.float32(1.0) / weights.sum(axis=1, dtype=np.float32)[:, np.newaxis]
+    return np.minimum(sources, input_size - 1), weights
+
+
+def gaussian_resize(image: np.ndarray, out_h: int, out_w: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Resize a float32 (h, w, c) image like tf.image.resize(method=GAUSSIAN), into `out` if given."""
+    h, w, c = image.shape
+    col_sources, col_weights = resize_spans(w, out_w)
+    row_sources, row_weights = resize_spans(h, out_h)
+    
+    # Height first: taps along rows are contiguous row copies, and the width
+    # pass then only runs on the out_h rows that are left
+    rows = np.zeros((out_h, w, c), dtype=np.float32)
+    for k in range(row_sources.shape[1]):
+        rows += image[row_sources[:, k]] * row_weights[:, k, np.newaxis, np.newaxis]
+    
+    if out is None:
+        out = np.zeros((out_h, out_w, c), dtype=np.float32)
+    else:
+        out[...] = 0.0
+    for k in range(col_sources.shape[1]):
+        out += rows[:, col_sources[:, k], :] * col_weights[np.newaxis, :, k, np.newaxis]
+    return out
+
+
+def _patch_counts(h: int, w: int, patch_stride: int) -> Tuple[int, int]:
+    """Patch grid size of an h x w image (SAME padding)."""
+    return -(-h // patch_stride), -(-w // patch_stride)
+
+
+def _padded_canvas_shape(h: int, w: int, c: int, patch_size: int, patch_stride: int) -> Tuple[int, int, int]:
+    """Shape of an h x w image with tf.image.extract_patches' SAME padding."""
+    count_h, count_w = _patch_counts(h, w, patch_stride)
+    return (max((count_h - 1) * patch_stride + patch_size, h), max((count_w - 1) * patch_stride + patch_size, w), c)
+
+
+def _padded_canvas(h: int, w: int, c: int, patch_size: int, patch_stride: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Zero canvas with tf.image.extract_patches' SAME padding, and the view where the image goes."""
+    padded_h, padded_w, _ = _padded_canvas_shape(h, w, c, patch_size, patch_stride)
+    top, left = (padded_h - h) // 2, (padded_w - w) // 2
+    canvas = np.zeros((padded_h, padded_w, c), dtype=np.float32)
+    return canvas, canvas[top:top + h, left:left + w]
+
+
+def _write_patches(out: np.ndarray, offset: int, canvas: np.ndarray, h: int, w: int, patch_size: int,
+                   patch_stride: int, hse_grid_size: int, scale_id: int, count: int):
+    """Copy the first `count` patches of a padded canvas (row-major) into out[offset:offset + count]."""
+    c = canvas.shape[2]
+    count_h, count_w = _patch_counts(h, w, patch_stride)
+    item = canvas.itemsize
+    # (count_h, count_w, p, p, c) view of the canvas; nothing is copied yet
+    grid = as_strided(canvas, shape=(count_h, count_w, patch_size, patch_size, c),
+                      strides=(patch_stride * canvas.strides[0], patch_stride * canvas.strides[1],
+                               canvas.strides[0], canvas.strides[1], item))
+    
+    # Matching (rows, count_w, p, p, c) views of the output rows
+    row_stride = out.strides[0]
+    patch_strides = (patch_size * c * item, c * item, item)
+    full_rows, rest = divmod(count, count_w)
+    if full_rows:
+        target = as_strided(out[offset:], shape=(full_rows, count_w, patch_size, patch_size, c),
+                            strides=(count_w * row_stride, row_stride) + patch_strides)
+        np.copyto(target, grid[:full_rows])
+    if rest:
+        target = as_strided(out[offset + full_rows * count_w:], shape=(rest, patch_size, patch_size, c),
+                            strides=(row_stride,) + patch_strides)
+        np.copyto(target, grid[full_rows, :rest])
+    
+    dim = patch_size * patch_size * c
+    rows = out[offset:offset + count]
+    rows[:, dim] = get_hashed_spatial_pos_emb_index(hse_grid_size, count_h, count_w)[:count]
+    rows[:, dim + 1] = scale_id
+    rows[:, dim + 2] = 1.0
+
+
+def get_multiscale_patches(image: np.ndarray, patch_size: int, patch_stride: int, hse_grid_size: int,
+                           longer_side_lengths: List[int], max_seq_len_from_original_res: Optional[int] = None,
+                           pyramid: bool = False) -> np.ndarray:
+    """Multi-scale patch sequence of an (h, w, 3) image.
+    
+    `image` is either normalized float32 or raw uint8; uint8 pixels are
+    normalized straight into the full-resolution canvas, saving a pass.
+    
+    Same arguments and output as preprocessing.get_multiscale_patches for a
+    single image: shape (num_patches, patch_size * patch_size * 3 + 3) with
+    the patch pixels followed by the hashed position, scale id and input mask.
+    """
+    h, w, c = image.shape
+    longer_side_lengths = sorted(longer_side_lengths)
+    original_id = len(longer_side_lengths)
+    
+    # (scale id, height, width, sequence length) of every scale, in output order
+    scales = []
+    for scale_id, longer_size in enumerate(longer_side_lengths):
+        rh, rw = resized_shape(h, w, longer_size)
+        scales.append((scale_id, rh, rw, int(np.ceil(longer_size / patch_stride) ** 2)))
+    if max_seq_len_from_original_res is not None:
+        scales.append((original_id, h, w, max_seq_len_from_original_res))
+    
+    offsets, seq_len = [], 0
+    for _, rh, rw, max_seq_len in scales:
+        offsets.append(seq_len)
+        count_h, count_w = _patch_counts(rh, rw, patch_stride)
+        seq_len += max_seq_len if max_seq_len >= 0 else count_h * count_w
+    out = np.zeros((seq_len, patch_size * patch_size * c + 3), dtype=np.float32)
+    
+    original_canvas = None
+    if image.dtype == np.uint8:
+        if max_seq_len_from_original_res is not None:
+            original_canvas, interior = _padded_canvas(h, w, c, patch_size, patch_stride)
+            image = normalize_image(image, out=interior)
+        else:
+            image = normalize_image(image)
+    
+    # Largest scale first, so pyramid mode can resize each scale from the previous one
+    order = sorted(range(len(scales)), key=lambda i: -scales[i][1] * scales[i][2])
+    source = image
+    for i in order:
+        scale_id, rh, rw, max_seq_len = scales[i]
+        if scale_id == original_id:
+            if original_canvas is not None:
+                canvas = original_canvas
+            elif _padded_canvas_shape(h, w, c, patch_size, patch_stride) == image.shape:
+                # No padding needed: the patch grid is a view of the image itself
+                canvas = image
+            else:
+                canvas, interior = _padded_canvas(h, w, c, patch_size, patch_stride)
+                interior[...] = image
+        else:
+            canvas, interior = _padded_canvas(rh, rw, c, patch_size, patch_stride)
+            gaussian_resize(source, rh, rw, out=interior)
+            if pyramid:
+                source = interior
+        count_h, count_w = _patch_counts(rh, rw, patch_stride)
+        count = count_h * count_w if max_seq_len < 0 else min(count_h * count_w, max_seq_len)
+        _write_patches(out, offsets[i], canvas, rh, rw, patch_size, patch_stride, hse_grid_size, scale_id, count)
+    return out
+
+
+def preprocess_image(image_bytes: bytes, pyramid: bool = False, **preprocessing_kwargs) -> np.ndarray:
+    """Decode, normalize and patchify an encoded image; `preprocessing_kwargs` as for get_preprocess_fn."""
+    return get_multiscale_patches(decode_image(image_bytes), pyramid=pyramid, **preprocessing_kwargs)
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Extract the MUSIQ multi-scale patch sequence of an image with NumPy",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python numpy_preprocessing.py --image sample.jpg
+  python numpy_preprocessing.py --image sample.jpg --pyramid
+
+See benchmark_preprocessing.py for the parity check against the TF graph.
+        """
+    )
+    
+    parser.add_argument('--image', required=True, help='Path to input image')
+    parser.add_argument('--pyramid', action='store_true',
+                       help='Resize each scale from the next larger one (faster, not bit-identical to TF)')
+    
+    args = parser.parse_args()
+    
+    try:
+        with open(args.image, 'rb') as f:
+            image_bytes = f.read()
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    patches = preprocess_image(image_bytes, pyramid=args.pyramid, patch_size=32, patch_stride=32,
+                               hse_grid_size=10, longer_side_lengths=[224, 384], max_seq_len_from_original_res=-1)
+    print(f"Patch sequence: {patches.shape[0]} patches x {patches.shape[1]} values "
+          f"({int(patches[:, -1].sum())} unmasked)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed result store for MUSIQ batch runs.
+
+Results are keyed by the image path relative to the input root, so images with
+the same file name in different subfolders no longer overwrite each other, and
+skip checks are indexed lookups instead of parsing one JSON file per image.
+The exporter writes the familiar per-image JSON layout for the gallery and
+analysis scripts.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    rel_path TEXT PRIMARY KEY,
+    image_name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    successful_predictions INTEGER,
+    failed_predictions INTEGER,
+    average_normalized_score REAL,
+    final_robust_score REAL,
+    read_seconds REAL,
+    inference_seconds REAL,
+    results_json TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    preprocessing_version TEXT,
+    aggregation_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_images_version ON images (version);
+CREATE TABLE IF NOT EXISTS model_scores (
+    rel_path TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    score REAL,
+    normalized_score REAL,
+    inference_seconds REAL,
+    version TEXT,
+    PRIMARY KEY (rel_path, model)
+);
+"""
+
+# Columns added after the first release of the store: (table, column, type)
+MIGRATIONS = [
+    ("images", "preprocessing_version", "TEXT"),
+    ("images", "aggregation_version", "TEXT"),
+    ("model_scores", "version", "TEXT"),
+]
+
+
+class ResultStore:
+    """Per-image MUSIQ results in a single indexed SQLite database."""
+    
+    def __init__(self, db_path: str, root_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.root_dir = os.path.abspath(root_dir) if root_dir else None
+        self._lock = threading.Lock()
+        
+        # Shared by the pipelined reader/writer threads (guarded by _lock) and
+        # safe to open from several worker processes thanks to WAL mode.
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.commit()
+    
+    def _migrate(self):
+        """Add columns missing from databases created by older versions."""
+        for table, column, column_type in MIGRATIONS:
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def relative_path(self, image_path: str) -> str:
+        """Return the store key for an image: its path relative to the root, with '/' separators."""
+        path = os.path.abspath(image_path)
+        if self.root_dir:
+            path = os.path.relpath(path, self.root_dir)
+        return path.replace(os.sep, '/')
+    
+    def get_version_info(self, rel_path: str) -> Optional[Dict[str, any]]:
+        """Return the version tags and per-model statuses of an image, shaped like its results.
+        
+        This is enough for MultiModelMUSIQ.plan_update / is_current and needs
+        only indexed lookups, no decoding of the stored results.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, preprocessing_version, aggregation_version FROM images WHERE rel_path = ?",
+                (rel_path,)).fetchone()
+            if row is None:
+                return None
+            models = self._conn.execute(
+                "SELECT model, status, version FROM model_scores WHERE rel_path = ? ORDER BY rowid",
+                (rel_path,)).fetchall()
+        
+        version, preprocessing_version, aggregation_version = row
+        info = {
+            "version": version,
+            "models": {model: {"status": status, "version": model_version}
+                       for model, status, model_version in models}
+        }
+        if preprocessing_version is not None:
+            info["versions"] = {"preprocessing": preprocessing_version, "aggregation": aggregation_version}
+        for model_result in info["models"].values():
+            if model_result["version"] is None:
+                del model_result["version"]
+        return info
+    
+    def get_results(self, rel_path: str) -> Optional[Dict[str, any]]:
+        """Return the full stored results dict for an image, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT results_json FROM images WHERE rel_path = ?", (rel_path,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_summary(self, rel_path: str) -> Optional[Dict[str, any]]:
+        """Return the batch-summary fields for an image without decoding its full results."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT image_name, version, successful_predictions, failed_predictions, average_normalized_score "
+                "FROM images WHERE rel_path = ?", (rel_path,)).fetchone()
+            if row is None:
+                return None
+            scores = self._conn.execute(
+                "SELECT model, score, normalized_score FROM model_scores WHERE rel_path = ? AND status = 'success' "
+                "ORDER BY rowid",
+                (rel_path,)).fetchall()
+        
+        image_name, version, successful, failed, average = row
+        return {
+            "image_name": image_name,
+            "version": version,
+            "models_successful": successful,
+            "models_failed": failed,
+            "average_normalized_score": average,
+            "individual_scores": {
+                model: {"score": score, "normalized_score": normalized_score}
+                for model, score, normalized_score in scores
+            }
+        }
+    
+    def put_results(self, rel_path: str, results: Dict[str, any], status: str = "success"):
+        """Insert or replace the results of one image."""
+        summary = results.get("summary", {})
+        timing = results.get("timing", {})
+        advanced = summary.get("advanced_scoring", {})
+        versions = results.get("versions", {})
+        image_name = os.path.splitext(os.path.basename(rel_path))[0]
+        
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (rel_path, image_name, results.get("version", "unknown"), status,
+                     summary.get("successful_predictions"), summary.get("failed_predictions"),
+                     summary.get("average_normalized_score"), advanced.get("final_robust_score"),
+                     timing.get("read_seconds"), timing.get("inference_seconds"),
+                     json.dumps(results), datetime.now().isoformat(),
+                     versions.get("preprocessing"), versions.get("aggregation")))
+                self._conn.execute("DELETE FROM model_scores WHERE rel_path = ?", (rel_path,))
+                self._conn.executemany(
+                    "INSERT INTO model_scores VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(rel_path, model_name, model_result.get("status", "unknown"), model_result.get("score"),
+                      model_result.get("normalized_score"), model_result.get("inference_seconds"),
+                      model_result.get("version"))
+                     for model_name, model_result in results.get("models", {}).items()])
+    
+    def count(self) -> int:
+        """Return the number of stored images."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    
+    def export_json(self, output_dir: str, preserve_tree: bool = False) -> int:
+        """Write one `<stem>.json` per stored image, in the layout run_all_musiq_models.py produces.
+        
+        With `preserve_tree` the input subfolders are recreated under
+        `output_dir`; otherwise all files are written flat, as before, and
+        images sharing a file name overwrite each other (a warning is printed).
+        Returns the number of files written.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT rel_path, results_json FROM images ORDER BY rel_path").fetchall()
+        
+        written = set()
+        collisions = 0
+        for rel_path, results_json in rows:
+            stem = os.path.splitext(os.path.basename(rel_path))[0]
+            if preserve_tree:
+                json_path = os.path.join(output_dir, os.path.dirname(rel_path), f"{stem}.json")
+            else:
+                json_path = os.path.join(output_dir, f"{stem}.json")
+            if json_path in written:
+                collisions += 1
+            written.add(json_path)
+            
+            os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
+            with open(json_path, 'w') as f:
+                json.dump(json.loads(results_json), f, indent=2)
+        
+        if collisions:
+            print(f"Warning: {collisions} images share a file name with another image and were overwritten; "
+                  f"use --preserve-tree to keep them apart")
+        return len(written)
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Inspect a MUSIQ result store or export it to per-image JSON files",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python result_store.py --db results.sqlite --export-dir "D:/Results"
+  python result_store.py --db results.sqlite --export-dir "D:/Results" --preserve-tree
+        """
+    )
+    
+    parser.add_argument('--db', required=True, help='Path to the SQLite result store')
+    parser.add_argument('--export-dir', help='Write per-image JSON files to this directory')
+    parser.add_argument('--preserve-tree', action='store_true',
+                       help='Recreate input subfolders when exporting (avoids file-name collisions)')
+    
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db):
+        print(f"Error: Result store not found: {args.db}")
+        sys.exit(1)
+    
+    store = ResultStore(args.db)
+    print(f"Images in store: {store.count()}")
+    
+    if args.export_dir:
+        written = store.export_json(args.export_dir, preserve_tree=args.preserve_tree)
+        print(f"Exported {written} JSON files to: {args.export_dir}")
+    
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
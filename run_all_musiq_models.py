@@ -5,18 +5,74 @@ The JSON file will have the same name as the image but with .json extension.
 """
 
 import argparse
+import base64
 import json
 import os
+import queue
 import sys
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
+from image_scanner import expand_image_args
+from scoring_daemon import ALL_MODELS, DEFAULT_PORT, human_output, report_result, run_client
+
+if __name__ == "__main__":
+    # Thin client: hand the image to a running scoring daemon before paying
+    # for the TensorFlow import and model loading (see scoring_daemon.py)
+    _exit_code = run_client(sys.argv[1:])
+    if _exit_code is not None:
+        sys.exit(_exit_code)
+
 import numpy as np
 import tensorflow as tf
 import tensorflow_hub as hub
 import kagglehub
 from PIL import Image
 
+from model_resolution import DEFAULT_CACHE_PATH, ResolutionCache
+from score_cache import ScoreCache, content_hash
+
+
+class ImageInput:
+    """Encoded image bytes read once and shared by every model.
+    
+    The serving signatures of all MUSIQ and VILA models take the raw encoded
+    bytes, so a single read and a single string tensor are enough for the
+    whole ensemble.
+    """
+    
+    def __init__(self, image_bytes: bytes, image_path: Optional[str] = None, read_time: float = 0.0):
+        self.image_bytes = image_bytes
+        self.image_path = image_path
+        self.read_time = read_time
+        self._tensor = None
+        self._content_hash = None
+    
+    @classmethod
+    def from_path(cls, image_path: str) -> "ImageInput":
+        """Read an image file and time the read."""
+        start = time.perf_counter()
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+        return cls(image_bytes, image_path, time.perf_counter() - start)
+    
+    @property
+    def content_hash(self) -> str:
+        """Content hash of the encoded bytes (computed once)."""
+        if self._content_hash is None:
+            self._content_hash = content_hash(self.image_bytes)
+        return self._content_hash
+    
+    def tensor(self, device: str):
+        """Return the bytes as a string tensor, building it on first use."""
+        if self._tensor is None:
+            with tf.device(device):
+                self._tensor = tf.constant(self.image_bytes)
+        return self._tensor
+
 
 class MultiModelMUSIQ:
     """Run multiple MUSIQ and VILA models on a single image."""
@@ -24,10 +80,52 @@ class MultiModelMUSIQ:
     # Version identifier for this implementation
     VERSION = "2.3.0"  # Triple fallback: TFHub → Kaggle Hub → Local Checkpoints
     
-    def __init__(self):
+    # Result version tags. Bump a model tag when its source or weights change,
+    # PREPROCESSING_VERSION when the input fed to the signatures changes, and
+    # AGGREGATION_VERSION when normalization or calculate_advanced_scores
+    # changes. Re-runs only call models whose tag changed (or that failed) and
+    # recompute aggregates from stored raw scores without inference. Scores of
+    # the native JAX backend are tagged "<tag>+jax" (see model_version), so
+    # they are never mixed up with SavedModel scores.
+    MODEL_VERSIONS = {
+        "spaq": "1",
+        "ava": "1",
+        "koniq": "1",
+        "paq2piq": "1",
+        "vila": "1"
+    }
+    PREPROCESSING_VERSION = "1"  # Encoded bytes passed straight to the serving signatures
+    AGGREGATION_VERSION = "1"    # Range normalization + outlier-robust advanced scores
+    
+    # Results written before the tags existed only carry VERSION
+    LEGACY_VERSIONS = {
+        "2.3.0": {
+            "models": {"spaq": "1", "ava": "1", "koniq": "1", "paq2piq": "1", "vila": "1"},
+            "preprocessing": "1",
+            "aggregation": "1"
+        }
+    }
+    
+    def __init__(self, intra_op_threads: Optional[int] = None, offline: bool = False,
+                 resolution_cache_path: Optional[str] = DEFAULT_CACHE_PATH, prefer_local: bool = False,
+                 parallel_models: bool = False):
         self.device = None
         self.gpu_available = False
         self.models = {}
+        # How each loaded model is run: "savedmodel" (TF Hub, Kaggle Hub or
+        # local SavedModel signature) or "jax" (native .npz checkpoint)
+        self.backends = {}
+        self.intra_op_threads = intra_op_threads
+        
+        # Where each model was last loaded from (see model_resolution.py); in
+        # offline mode only those artifacts and local checkpoints are used.
+        # prefer_local tries local checkpoints before TF Hub and Kaggle Hub.
+        self.offline = offline
+        self.prefer_local = prefer_local
+        self.resolution_cache = ResolutionCache(resolution_cache_path) if resolution_cache_path else None
+        
+        # Optional content-hash score cache (see score_cache.py)
+        self.score_cache: Optional[ScoreCache] = None
         
         # Model availability on different platforms
         # All models with TensorFlow Hub, Kaggle Hub, and local checkpoint paths
@@ -84,6 +182,35 @@ class MultiModelMUSIQ:
             "vila": (0.0, 1.0)         # VILA aesthetic score: 0-1 (official range)
         }
         
+        # Optional TensorFlow intra-op thread count (e.g. one share per batch
+        # worker process). Only takes effect before the runtime initializes.
+        if intra_op_threads:
+            self._set_tf_threads("intra_op", intra_op_threads)
+        
+        # Optional concurrent ensemble: the models of one image run on a thread
+        # pool (TensorFlow releases the GIL while a signature executes).
+        # TensorFlow has no per-call intra-op pool, so the models' kernels
+        # share the one process-wide intra-op pool, which bounds the total
+        # thread count (no oversubscription) without a fixed per-model split.
+        # If inter-op threads are still unset, one per model lets each
+        # signature's graph be dispatched without waiting for the others.
+        self.parallel_models = parallel_models
+        self._model_pool = None
+        if parallel_models:
+            if tf.config.threading.get_inter_op_parallelism_threads() == 0:
+                self._set_tf_threads("inter_op", len(self.model_sources))
+            self._model_pool = ThreadPoolExecutor(max_workers=len(self.model_sources),
+                                                  thread_name_prefix="musiq-model")
+        
+        # Per-image progress output; batch runs turn it off for --quiet
+        self.verbose = True
+        
+        # Lazy loading: models in pending_models are loaded the first time
+        # they are needed. Load time (seconds) per loaded model.
+        self.pending_models = set()
+        self.load_seconds = {}
+        self._load_locks = {model_name: threading.Lock() for model_name in self.model_sources}
+        
         # Initialize GPU support
         self._setup_gpu()
         
@@ -126,6 +253,14 @@ class MultiModelMUSIQ:
         
         This provides maximum reliability across different network conditions,
         authentication states, and offline scenarios.
+        
+        The artifact that worked is recorded in the resolution cache and
+        loaded directly next time; sources that failed recently are skipped,
+        and offline mode skips TF Hub and Kaggle Hub altogether. With
+        prefer_local, an existing local checkpoint is tried first.
+        
+        Local .npz checkpoints run on the native JAX model
+        (musiq_jax_backend.py) instead of a SavedModel signature.
         """
         if model_name not in self.model_sources:
             print(f"Error: Unknown model variant '{model_name}'")
@@ -136,21 +271,59 @@ class MultiModelMUSIQ:
         kaggle_path = sources.get("kaggle")
         local_path = sources.get("local")
         
+        # Local checkpoint first (e.g. native .npz inference), network sources as fallback
+        local_first = self.prefer_local and bool(local_path) and os.path.exists(local_path)
+        
+        # Load the artifact that worked last time straight from disk
+        if self.resolution_cache is not None and not local_first:
+            resolved = self.resolution_cache.resolved(model_name, sources)
+            if resolved is not None:
+                try:
+                    print(f"Loading {model_name.upper()} model from cached {resolved['source']} artifact: "
+                          f"{resolved['path']}")
+                    if resolved["path"].endswith('.npz'):
+                        self._load_npz(model_name, resolved["path"])
+                    else:
+                        with tf.device(self.device):
+                            if resolved["source"] == "tfhub":
+                                model = hub.load(resolved["path"])
+                            else:
+                                model = tf.saved_model.load(resolved["path"])
+                            self.models[model_name] = model
+                            self.backends[model_name] = "savedmodel"
+                    print(f"✓ {model_name.upper()} model loaded successfully from cached artifact")
+                    return True
+                except Exception as e:
+                    print(f"⚠ Cached artifact failed for {model_name.upper()}: {str(e)[:80]}...")
+                    self.resolution_cache.forget(model_name)
+        
+        if local_first and self._load_local(model_name, local_path):
+            return True
+        
+        if self.offline:
+            print(f"Offline mode: skipping TF Hub and Kaggle Hub for {model_name.upper()}")
+            tfhub_url = None
+            kaggle_path = None
+        
         # Try TensorFlow Hub first (preferred - no auth needed, usually faster)
-        if tfhub_url:
+        if tfhub_url and not self._failed_recently(model_name, "tfhub", tfhub_url):
             try:
                 print(f"Loading {model_name.upper()} model from TensorFlow Hub: {tfhub_url}")
                 with tf.device(self.device):
-                    model = hub.load(tfhub_url)
+                    model_path = hub.resolve(tfhub_url)
+                    model = hub.load(model_path)
                     self.models[model_name] = model
+                    self.backends[model_name] = "savedmodel"
+                    self._record_success(model_name, "tfhub", tfhub_url, model_path)
                     print(f"✓ {model_name.upper()} model loaded successfully from TensorFlow Hub")
                     return True
             except Exception as e:
                 print(f"⚠ TensorFlow Hub failed for {model_name.upper()}: {str(e)[:80]}...")
                 print(f"  Falling back to Kaggle Hub...")
+                self._record_failure(model_name, "tfhub", tfhub_url, e)
         
         # Fall back to Kaggle Hub (requires authentication)
-        if kaggle_path:
+        if kaggle_path and not self._failed_recently(model_name, "kaggle", kaggle_path):
             try:
                 print(f"Loading {model_name.upper()} model from Kaggle Hub: {kaggle_path}")
                 
@@ -162,40 +335,20 @@ class MultiModelMUSIQ:
                 with tf.device(self.device):
                     model = tf.saved_model.load(model_path)
                     self.models[model_name] = model
+                    self.backends[model_name] = "savedmodel"
+                    self._record_success(model_name, "kaggle", kaggle_path, model_path)
                     print(f"✓ {model_name.upper()} model loaded successfully from Kaggle Hub")
                     return True
-                    
+            
             except Exception as e:
                 print(f"⚠ Kaggle Hub failed for {model_name.upper()}: {str(e)[:80]}...")
                 print(f"  Falling back to local checkpoint...")
+                self._record_failure(model_name, "kaggle", kaggle_path, e)
         
         # Fall back to local checkpoint (offline, no network needed)
         if local_path and os.path.exists(local_path):
-            try:
-                print(f"Loading {model_name.upper()} model from local checkpoint: {local_path}")
-                
-                with tf.device(self.device):
-                    # Check if it's a SavedModel directory or .npz file
-                    if os.path.isdir(local_path):
-                        # Load SavedModel (VILA cached model)
-                        model = tf.saved_model.load(local_path)
-                        self.models[model_name] = model
-                        print(f"✓ {model_name.upper()} model loaded successfully from local SavedModel")
-                        return True
-                    elif local_path.endswith('.npz'):
-                        # Load .npz checkpoint (MUSIQ models)
-                        # Note: .npz files require the original MUSIQ loading code
-                        # For now, try loading as SavedModel if conversion exists
-                        print(f"⚠ .npz checkpoint loading not yet implemented for {model_name.upper()}")
-                        print(f"  Checkpoint available at: {local_path}")
-                        print(f"  Consider using TF Hub or Kaggle Hub sources instead")
-                        return False
-                    else:
-                        print(f"⚠ Unknown local checkpoint format: {local_path}")
-                        return False
-                        
-            except Exception as e:
-                print(f"✗ Failed to load {model_name.upper()} model from local checkpoint: {str(e)[:80]}...")
+            if not local_first and self._load_local(model_name, local_path):
+                return True
         elif local_path:
             print(f"⚠ Local checkpoint not found: {local_path}")
             print(f"  Download checkpoints from: https://storage.googleapis.com/gresearch/musiq/")
@@ -215,16 +368,124 @@ class MultiModelMUSIQ:
         
         return False
     
-    def load_all_models(self) -> Dict[str, bool]:
-        """Load all available MUSIQ models."""
-        results = {}
-        for model_name in self.model_sources.keys():
-            results[model_name] = self.load_model(model_name)
-        return results
+    def _load_local(self, model_name: str, local_path: str) -> bool:
+        """Load a local checkpoint: a SavedModel directory or an original .npz checkpoint (native JAX)."""
+        try:
+            print(f"Loading {model_name.upper()} model from local checkpoint: {local_path}")
+            
+            # Check if it's a SavedModel directory or .npz file
+            if os.path.isdir(local_path):
+                with tf.device(self.device):
+                    # Load SavedModel (VILA cached model)
+                    model = tf.saved_model.load(local_path)
+                    self.models[model_name] = model
+                    self.backends[model_name] = "savedmodel"
+                    self._record_success(model_name, "local", local_path, local_path)
+                    print(f"✓ {model_name.upper()} model loaded successfully from local SavedModel")
+                    return True
+            elif local_path.endswith('.npz'):
+                # Original MUSIQ checkpoint, run natively with JAX
+                self._load_npz(model_name, local_path)
+                self._record_success(model_name, "local", local_path, local_path)
+                print(f"✓ {model_name.upper()} model loaded successfully from local .npz checkpoint (JAX)")
+                return True
+            else:
+                print(f"⚠ Unknown local checkpoint format: {local_path}")
+                return False
+        except ImportError as e:
+            print(f"✗ JAX backend unavailable for {model_name.upper()}: {e}")
+            print("  Install it with: pip install -r musiq_original/requirements.txt")
+        except Exception as e:
+            print(f"✗ Failed to load {model_name.upper()} model from local checkpoint: {str(e)[:80]}...")
+        return False
+    
+    def _load_npz(self, model_name: str, checkpoint_path: str):
+        """Load an original .npz checkpoint with the native JAX model (see musiq_jax_backend.py)."""
+        # Imported here: JAX and Flax are only needed for .npz checkpoints
+        from musiq_jax_backend import NpzMusiqModel
+        
+        self.models[model_name] = NpzMusiqModel.for_model(model_name, checkpoint_path)
+        self.backends[model_name] = "jax"
+    
+    def _failed_recently(self, model_name: str, source: str, location: str) -> bool:
+        """Whether a source failed within the resolution cache's negative TTL (and should be skipped)."""
+        if self.resolution_cache is None:
+            return False
+        age = self.resolution_cache.failed_recently(model_name, source, location)
+        if age is None:
+            return False
+        print(f"Skipping {source} for {model_name.upper()}: failed {age / 60:.0f} min ago "
+              f"(clear with: python model_resolution.py --clear-failures)")
+        return True
+    
+    def _record_success(self, model_name: str, source: str, location: str, path: str):
+        """Record the artifact a model was loaded from in the resolution cache."""
+        if self.resolution_cache is not None:
+            self.resolution_cache.record_success(model_name, source, location, path)
+    
+    def _record_failure(self, model_name: str, source: str, location: str, error: Exception):
+        """Record a failed source in the resolution cache."""
+        if self.resolution_cache is not None:
+            self.resolution_cache.record_failure(model_name, source, location, error)
     
-    def predict_quality(self, image_path: str, model_name: str) -> Optional[float]:
-        """Predict image quality using a specific model."""
-        if model_name not in self.models:
+    @staticmethod
+    def _set_tf_threads(kind: str, threads: int) -> bool:
+        """Set TensorFlow's "intra_op" or "inter_op" thread count; returns whether it is in effect.
+        
+        The count cannot change once TensorFlow has run an op (e.g. a second
+        scorer in the same process); the setting is then ignored with a warning.
+        """
+        if getattr(tf.config.threading, f"get_{kind}_parallelism_threads")() == threads:
+            return True
+        try:
+            getattr(tf.config.threading, f"set_{kind}_parallelism_threads")(threads)
+            return True
+        except RuntimeError:
+            print(f"⚠ TensorFlow is already initialized; ignoring {kind.replace('_', '-')} threads = {threads}")
+            return False
+    
+    def load_all_models(self, models: Optional[List[str]] = None, max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """Load all available MUSIQ models (or just `models`) concurrently on a thread pool."""
+        model_names = list(models or self.model_sources.keys())
+        with ThreadPoolExecutor(max_workers=max_workers or len(model_names)) as pool:
+            return dict(zip(model_names, pool.map(self._timed_load, model_names)))
+    
+    def defer_models(self, models: Optional[List[str]] = None):
+        """Load models lazily: each one is loaded the first time it is needed, models never used are never loaded."""
+        self.pending_models.update(model_name for model_name in (models or self.model_sources.keys())
+                                   if model_name not in self.models)
+    
+    def is_available(self, model_name: str) -> bool:
+        """Whether a model is loaded or will be loaded on first use."""
+        return model_name in self.models or model_name in self.pending_models
+    
+    def ensure_loaded(self, model_name: str) -> bool:
+        """Load a pending (lazy) model if needed; returns whether the model is loaded."""
+        if model_name in self.models:
+            return True
+        if model_name not in self.pending_models:
+            return False
+        with self._load_locks[model_name]:
+            # Another thread may have loaded it while we waited
+            if model_name in self.pending_models:
+                self._timed_load(model_name)
+                self.pending_models.discard(model_name)
+        return model_name in self.models
+    
+    def _timed_load(self, model_name: str) -> bool:
+        """load_model, recording the load time in load_seconds."""
+        start = time.perf_counter()
+        loaded = self.load_model(model_name)
+        self.load_seconds[model_name] = round(time.perf_counter() - start, 3)
+        return loaded
+    
+    def predict_quality(self, image: Union[str, ImageInput], model_name: str) -> Optional[float]:
+        """Predict image quality using a specific model.
+        
+        `image` is either a path or an ImageInput that was already read, so
+        callers running several models can share one read.
+        """
+        if not self.ensure_loaded(model_name):
             print(f"Error: Model '{model_name}' not loaded")
             return None
         
@@ -232,14 +493,17 @@ class MultiModelMUSIQ:
         model_type = self.model_types.get(model_name, "musiq")
         
         try:
-            # Read image bytes
-            with open(image_path, 'rb') as f:
-                image_bytes = f.read()
+            if not isinstance(image, ImageInput):
+                image = ImageInput.from_path(image)
+            
+            if self.backends.get(model_name) == "jax":
+                # Native model: preprocessing and the jit-compiled forward pass
+                return model.predict(image.image_bytes)
             
             # Ensure tensor is on correct device
             with tf.device(self.device):
                 # TensorFlow Hub/Kaggle models expect image bytes as string tensor
-                image_bytes_tensor = tf.constant(image_bytes)
+                image_bytes_tensor = image.tensor(self.device)
                 
                 # Determine correct parameter name for model
                 # VILA models use 'image_bytes', MUSIQ models use 'image_bytes_tensor'
@@ -279,13 +543,85 @@ class MultiModelMUSIQ:
                     score = float(predictions.numpy().squeeze())
             
             return score
-            
+        
         except Exception as e:
             print(f"Error predicting with {model_name.upper()} model: {e}")
             return None
     
-    def run_all_models(self, image_path: str) -> Dict[str, any]:
-        """Run all loaded models on the image and return results."""
+    def predict_batch(self, images: List[ImageInput], model_name: str) -> List[Optional[float]]:
+        """Predict the quality of several images with one model.
+        
+        Native (.npz) models score the whole batch in one padded forward pass;
+        the TF Hub / Kaggle signatures take a single image, so they are
+        called once per image.
+        """
+        if not self.ensure_loaded(model_name):
+            print(f"Error: Model '{model_name}' not loaded")
+            return [None] * len(images)
+        
+        if self.backends.get(model_name) == "jax":
+            try:
+                return [float(score) for score in
+                        self.models[model_name].predict_batch([image.image_bytes for image in images])]
+            except Exception as e:
+                print(f"Error predicting batch with {model_name.upper()} model: {e}")
+                return [None] * len(images)
+        return [self.predict_quality(image, model_name) for image in images]
+    
+    def _predict_concurrently(self, image_input: ImageInput,
+                              model_names: List[str]) -> Dict[str, Tuple[Optional[float], float]]:
+        """Run several models on one image on the model pool; returns model -> (score, inference seconds)."""
+        def timed_predict(model_name: str) -> Tuple[Optional[float], float]:
+            start = time.perf_counter()
+            score = self.predict_quality(image_input, model_name)
+            return score, time.perf_counter() - start
+        
+        # Build the shared bytes tensor once, before the threads use it
+        image_input.tensor(self.device)
+        futures = {model_name: self._model_pool.submit(timed_predict, model_name) for model_name in model_names}
+        return {model_name: future.result() for model_name, future in futures.items()}
+    
+    def run_all_models(self, image: Union[str, ImageInput], existing: Optional[Dict[str, any]] = None,
+                       models: Optional[List[str]] = None, quiet: bool = False,
+                       scores: Optional[Dict[str, Tuple[Optional[float], float]]] = None) -> Dict[str, any]:
+        """Run all loaded models on the image and return results.
+        
+        The image is read once and the same bytes tensor is passed to every
+        model; read and inference times are reported separately.
+        
+        If `existing` results are given, only the models whose version tag
+        changed or whose earlier result was failed/not_loaded are run; the
+        other per-model results are kept and the aggregate scores are
+        recomputed. When no model needs to run, the image is not read at all.
+        
+        `models` restricts the run to a subset of the models; the others are
+        left out of the results. `quiet` suppresses the per-model progress
+        output regardless of `verbose`. `scores` are raw scores the caller
+        already computed (model -> (score, inference seconds)), e.g. in a
+        batched forward pass; those models are not called again.
+        
+        With `parallel_models`, the loaded models that need inference run
+        concurrently; the results dict is the same as in a serial run.
+        """
+        verbose = self.verbose and not quiet
+        if isinstance(image, ImageInput):
+            image_input = image
+            image_path = image.image_path
+        else:
+            image_input = None
+            image_path = image
+        
+        selected_models = [model_name for model_name in self.model_sources if models is None or model_name in models]
+        models_to_run = list(selected_models)
+        kept_models = {}
+        if existing is not None:
+            models_to_run = [model_name for model_name in self.plan_update(existing)[0] if model_name in selected_models]
+            existing_tags = self._existing_versions(existing).get("models", {})
+            for model_name, model_result in existing.get("models", {}).items():
+                if model_name in selected_models and model_name not in models_to_run:
+                    kept_models[model_name] = dict(model_result)
+                    kept_models[model_name].setdefault("version", existing_tags.get(model_name))
+        
         results = {
             "version": self.VERSION,
             "image_path": image_path,
@@ -294,94 +630,350 @@ class MultiModelMUSIQ:
             "gpu_available": self.gpu_available,
             "models": {},
             "summary": {
-                "total_models": len(self.models),
+                "total_models": sum(1 for model_name in selected_models if self.is_available(model_name)),
                 "successful_predictions": 0,
                 "failed_predictions": 0,
                 "average_normalized_score": None
-            }
+            },
+            "timing": {
+                "read_seconds": None,
+                "inference_seconds": 0.0
+            },
+            "versions": self.current_versions()
         }
         
-        print(f"\nRunning all models on: {image_path}")
-        print("=" * 60)
+        if verbose:
+            print(f"\nRunning all models on: {image_path}")
+            print("=" * 60)
         
-        normalized_scores = []
+        read_error = None
+        if image_input is None and models_to_run:
+            try:
+                image_input = ImageInput.from_path(image_path)
+            except Exception as e:
+                read_error = str(e)
+                print(f"Error reading image: {e}")
+        if image_input is not None:
+            results["timing"]["read_seconds"] = round(image_input.read_time, 4)
         
-        for model_name in self.model_sources.keys():
-            if model_name in self.models:
-                print(f"Processing with {model_name.upper()} model...")
-                score = self.predict_quality(image_path, model_name)
+        # Scores for these exact bytes may already be cached (renamed, moved
+        # or re-exported file); only the remaining models run inference
+        cached_scores = {}
+        new_scores = {}
+        cache_versions = self.cache_model_versions()
+        run_loaded = [name for name in models_to_run if self.is_available(name)]
+        if self.score_cache is not None and image_input is not None:
+            cached_scores = self.score_cache.get(
+                image_input.content_hash, {name: cache_versions[name] for name in run_loaded})
+            results["summary"]["cache_hits"] = len(cached_scores)
+            results["summary"]["cache_misses"] = len(run_loaded) - len(cached_scores)
+        
+        if self.parallel_models and image_input is not None:
+            # Lazily loaded models are left to the loop, which records their load time
+            concurrent_models = [name for name in run_loaded if name in self.models
+                                 and name not in cached_scores and not (scores and name in scores)]
+            if len(concurrent_models) > 1:
+                if verbose:
+                    print(f"Processing with {', '.join(name.upper() for name in concurrent_models)} "
+                          f"models concurrently...")
+                scores = dict(scores or {}, **self._predict_concurrently(image_input, concurrent_models))
+        
+        for model_name in selected_models:
+            if model_name in kept_models:
+                # Current from the earlier run (or stale but not loaded now)
+                results["models"][model_name] = kept_models[model_name]
+                if verbose:
+                    print(f"  {model_name.upper()} model: kept earlier result")
+            elif self.is_available(model_name) and read_error is not None:
+                results["models"][model_name] = {
+                    "score": None,
+                    "error": f"Image read failed: {read_error}",
+                    "status": "failed"
+                }
+            elif self.is_available(model_name):
+                load_time = None
+                if model_name not in cached_scores and model_name not in self.models:
+                    # Lazy model needed for the first time
+                    if not self.ensure_loaded(model_name):
+                        results["models"][model_name] = {
+                            "score": None,
+                            "error": "Model failed to load",
+                            "status": "not_loaded"
+                        }
+                        continue
+                    load_time = self.load_seconds[model_name]
+                    results["timing"]["load_seconds"] = round(
+                        results["timing"].get("load_seconds", 0.0) + load_time, 3)
+                
+                if model_name in cached_scores:
+                    if verbose:
+                        print(f"Using cached {model_name.upper()} score...")
+                    score = cached_scores[model_name]
+                    inference_time = 0.0
+                else:
+                    if scores and model_name in scores:
+                        score, inference_time = scores[model_name]
+                    else:
+                        if verbose:
+                            print(f"Processing with {model_name.upper()} model...")
+                        start = time.perf_counter()
+                        score = self.predict_quality(image_input, model_name)
+                        inference_time = time.perf_counter() - start
+                    results["timing"]["inference_seconds"] += inference_time
+                    if score is not None:
+                        new_scores[model_name] = score
                 
                 if score is not None:
                     min_score, max_score = self.model_ranges[model_name]
-                    normalized_score = (score - min_score) / (max_score - min_score)
-                    normalized_scores.append(normalized_score)
-                    
                     results["models"][model_name] = {
                         "score": round(score, 2),
+                        "raw_score": score,
                         "score_range": f"{min_score}-{max_score}",
-                        "normalized_score": round(normalized_score, 3),
+                        "inference_seconds": round(inference_time, 4),
+                        "version": self.model_version(model_name),
                         "status": "success"
                     }
-                    results["summary"]["successful_predictions"] += 1
-                    print(f"  {model_name.upper()} score: {score:.2f} (range: {min_score}-{max_score})")
+                    if model_name in cached_scores:
+                        results["models"][model_name]["cached"] = True
+                    if load_time is not None:
+                        results["models"][model_name]["load_seconds"] = load_time
+                    if verbose:
+                        print(f"  {model_name.upper()} score: {score:.2f} (range: {min_score}-{max_score})")
                 else:
                     results["models"][model_name] = {
                         "score": None,
                         "error": "Prediction failed",
+                        "inference_seconds": round(inference_time, 4),
+                        "version": self.model_version(model_name),
                         "status": "failed"
                     }
-                    results["summary"]["failed_predictions"] += 1
-                    print(f"  {model_name.upper()} model: FAILED")
+                    if verbose:
+                        print(f"  {model_name.upper()} model: FAILED")
             else:
                 results["models"][model_name] = {
                     "score": None,
                     "error": "Model not loaded",
                     "status": "not_loaded"
                 }
-                results["summary"]["failed_predictions"] += 1
-                print(f"  {model_name.upper()} model: NOT LOADED")
+                if verbose:
+                    print(f"  {model_name.upper()} model: NOT LOADED")
+        
+        results["timing"]["inference_seconds"] = round(results["timing"]["inference_seconds"], 4)
+        
+        if self.score_cache is not None and new_scores:
+            # Lazily loaded models now have their actual backend
+            self.score_cache.put(image_input.content_hash, new_scores, self.cache_model_versions())
+        
+        results["versions"]["models"] = self.current_versions()["models"]
+        self.aggregate_results(results)
+        return results
+    
+    def score_iter(self, images: Iterable[Union[str, bytes, ImageInput]], models: Optional[List[str]] = None,
+                   batch_size: int = 16, workers: int = 1, ordered: bool = True) -> Iterator[Dict[str, any]]:
+        """Score a stream of images lazily, yielding one results dict per image.
+        
+        `images` may be any iterable (also a generator over millions of
+        paths) of image paths, encoded image bytes, or ImageInput objects;
+        bytes are named "bytes:<index>" in the results. Each image goes
+        through run_all_models (same score extraction, normalization and
+        advanced scores) without progress output.
+        
+        At most `batch_size` images are read and scored ahead of the consumer,
+        on `workers` threads, so memory stays bounded however long the
+        stream is. With `ordered=False`, results are yielded as they finish
+        instead of in input order.
+        """
+        def score_one(index: int, item: Union[str, bytes, ImageInput]) -> Dict[str, any]:
+            if isinstance(item, (bytes, bytearray)):
+                item = ImageInput(bytes(item), f"bytes:{index}")
+            return self.run_all_models(item, models=models, quiet=True)
+        
+        def finished(pending: list) -> Iterator[Dict[str, any]]:
+            # The oldest result when ordered, otherwise whichever finished first
+            if ordered:
+                yield pending.pop(0).result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+        
+        window = max(batch_size, workers, 1)
+        pool = ThreadPoolExecutor(max_workers=max(workers, 1))
+        try:
+            pending = []
+            for index, item in enumerate(images):
+                pending.append(pool.submit(score_one, index, item))
+                if len(pending) >= window:
+                    yield from finished(pending)
+            
+            # Drain the tail of the stream
+            while pending:
+                yield from finished(pending)
+        finally:
+            # Consumer stopped early (or an image raised): drop queued work
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def aggregate_results(self, results: Dict[str, any]) -> Dict[str, any]:
+        """Compute normalized scores and summary statistics from the per-model raw scores.
+        
+        This is the aggregation step tagged by AGGREGATION_VERSION; it needs
+        no inference, so stale aggregates can be recomputed from stored results.
+        """
+        summary = results["summary"]
+        summary["successful_predictions"] = 0
+        summary["failed_predictions"] = 0
+        summary["average_normalized_score"] = None
+        summary.pop("advanced_scoring", None)
+        
+        # Unrounded for the average; advanced scores use the rounded values
+        unrounded_scores = []
+        normalized_scores = {}
+        for model_name, model_result in results["models"].items():
+            if model_result["status"] != "success":
+                summary["failed_predictions"] += 1
+                continue
+            
+            score = model_result.get("raw_score", model_result["score"])
+            min_score, max_score = self.model_ranges[model_name]
+            normalized_score = (score - min_score) / (max_score - min_score)
+            model_result["normalized_score"] = round(normalized_score, 3)
+            unrounded_scores.append(normalized_score)
+            normalized_scores[model_name] = model_result["normalized_score"]
+            summary["successful_predictions"] += 1
         
         # Calculate average normalized score
         if normalized_scores:
-            average_normalized = sum(normalized_scores) / len(normalized_scores)
-            results["summary"]["average_normalized_score"] = round(average_normalized, 3)
+            average_normalized = sum(unrounded_scores) / len(unrounded_scores)
+            summary["average_normalized_score"] = round(average_normalized, 3)
             
             # Calculate advanced scoring methods
-            normalized_scores_dict = {}
-            for model_name, model_result in results["models"].items():
-                if model_result["status"] == "success":
-                    normalized_scores_dict[model_name] = model_result["normalized_score"]
-            
-            if normalized_scores_dict:
-                advanced_scores = self.calculate_advanced_scores(normalized_scores_dict)
-                results["summary"]["advanced_scoring"] = advanced_scores
+            summary["advanced_scoring"] = self.calculate_advanced_scores(normalized_scores)
         
+        results.setdefault("versions", self.current_versions())["aggregation"] = self.AGGREGATION_VERSION
         return results
     
-    def is_already_processed(self, image_path: str, output_dir: str) -> bool:
-        """Check if image has already been processed with current version."""
+    def current_versions(self) -> Dict[str, any]:
+        """Version tags that results produced now are stamped with."""
+        return {
+            "models": {model_name: self.model_version(model_name) for model_name in self.MODEL_VERSIONS},
+            "preprocessing": self.PREPROCESSING_VERSION,
+            "aggregation": self.AGGREGATION_VERSION
+        }
+    
+    def cache_model_versions(self) -> Dict[str, str]:
+        """Version each model's cached scores are stored under (model and preprocessing tags)."""
+        return {model_name: f"{self.model_version(model_name)}/pp{self.PREPROCESSING_VERSION}"
+                for model_name in self.model_sources}
+    
+    def model_backend(self, model_name: str) -> str:
+        """Backend ("savedmodel" or "jax") a model's scores come from.
+        
+        The loaded backend; for a model that is not loaded (yet), the one
+        load_model would pick first: a preferred local checkpoint, the
+        cached artifact, or in offline mode the local checkpoint.
+        """
+        if model_name in self.backends:
+            return self.backends[model_name]
+        sources = self.model_sources[model_name]
+        local_path = sources.get("local") or ""
+        local_npz = local_path.endswith('.npz') and os.path.exists(local_path)
+        if self.prefer_local and local_path and os.path.exists(local_path):
+            return "jax" if local_npz else "savedmodel"
+        resolved = self.resolution_cache.resolved(model_name, sources) if self.resolution_cache is not None else None
+        if resolved is not None:
+            return "jax" if resolved["path"].endswith('.npz') else "savedmodel"
+        return "jax" if self.offline and local_npz else "savedmodel"
+    
+    def model_version(self, model_name: str) -> str:
+        """Version tag of a model's scores: its MODEL_VERSIONS tag, plus the backend unless it is a SavedModel."""
+        backend = self.model_backend(model_name)
+        version = self.MODEL_VERSIONS[model_name]
+        return version if backend == "savedmodel" else f"{version}+{backend}"
+    
+    def _existing_versions(self, existing: Dict[str, any]) -> Dict[str, any]:
+        """Version tags of earlier results, mapping pre-tag files to the tags they correspond to."""
+        if "versions" in existing:
+            return existing["versions"]
+        return self.LEGACY_VERSIONS.get(existing.get("version"), {})
+    
+    def plan_update(self, existing: Dict[str, any]) -> Tuple[List[str], bool]:
+        """Decide what to redo for earlier results.
+        
+        Returns (models to re-run, whether the aggregate scores are stale).
+        A model is re-run when its model or preprocessing tag changed or its
+        earlier result was failed/not_loaded. Models that are not loaded now
+        cannot be re-run, so their earlier results are left as they are.
+        """
+        versions = self._existing_versions(existing)
+        model_versions = versions.get("models", {})
+        preprocessing_changed = versions.get("preprocessing") != self.PREPROCESSING_VERSION
+        
+        models_to_run = []
+        for model_name in self.model_sources.keys():
+            model_result = existing.get("models", {}).get(model_name, {})
+            stale = (preprocessing_changed
+                     or model_result.get("status") != "success"
+                     or model_result.get("version", model_versions.get(model_name)) != self.model_version(model_name))
+            if stale and self.is_available(model_name):
+                models_to_run.append(model_name)
+        
+        aggregation_stale = bool(models_to_run) or versions.get("aggregation") != self.AGGREGATION_VERSION
+        return models_to_run, aggregation_stale
+    
+    def is_current(self, existing: Dict[str, any]) -> bool:
+        """Check if earlier results need neither inference nor re-aggregation."""
+        models_to_run, aggregation_stale = self.plan_update(existing)
+        return not models_to_run and not aggregation_stale
+    
+    def load_existing_results(self, image_path: str, output_dir: str) -> Optional[Dict[str, any]]:
+        """Load the earlier `<stem>.json` results for an image, or None."""
         image_name = os.path.splitext(os.path.basename(image_path))[0]
         json_path = os.path.join(output_dir, f"{image_name}.json")
         
         if not os.path.exists(json_path):
-            return False
+            return None
         
         try:
             with open(json_path, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-            
-            # Check if version matches
-            existing_version = existing_data.get('version', 'unknown')
-            if existing_version == self.VERSION:
-                print(f"Image already processed with version {self.VERSION}: {image_path}")
-                return True
-            else:
-                print(f"Version mismatch - existing: {existing_version}, current: {self.VERSION}")
-                return False
-                
+                return json.load(f)
         except Exception as e:
             print(f"Error checking existing results: {e}")
+            return None
+    
+    def score_to_file(self, image_path: str, output_dir: str) -> Tuple[str, str, Dict[str, any]]:
+        """Score one image into `<output_dir>/<stem>.json` unless its results are current.
+        
+        Returns (status, output_path, results) with status "skipped" (the
+        existing results are returned) or "scored". Raises OSError if the
+        results could not be saved.
+        """
+        output_path = os.path.join(output_dir, f"{Path(image_path).stem}.json")
+        existing = self.load_existing_results(image_path, output_dir)
+        if existing is not None and self.is_current(existing):
+            return "skipped", output_path, existing
+        
+        # Run all models on the image (only stale models when results exist)
+        results = self.run_all_models(image_path, existing=existing)
+        if not self.save_results(results, output_path):
+            raise OSError(f"Could not save results to {output_path}")
+        return "scored", output_path, results
+    
+    def is_already_processed(self, image_path: str, output_dir: str) -> bool:
+        """Check if image has already been processed with the current model, preprocessing and aggregation versions."""
+        existing = self.load_existing_results(image_path, output_dir)
+        if existing is None:
             return False
+        
+        models_to_run, aggregation_stale = self.plan_update(existing)
+        if not models_to_run and not aggregation_stale:
+            print(f"Image already processed with current versions: {image_path}")
+            return True
+        if models_to_run:
+            print(f"Models to re-run: {', '.join(models_to_run)}")
+        else:
+            print("Aggregation version changed - scores will be recomputed without inference")
+        return False
     
     def calculate_weighted_score(self, scores: Dict[str, float]) -> float:
         """Calculate weighted average score."""
@@ -463,26 +1055,134 @@ class MultiModelMUSIQ:
             "models_used": len(filtered_scores)
         }
     
-    def save_results(self, results: Dict[str, any], output_path: str):
-        """Save results to JSON file."""
+    def save_results(self, results: Dict[str, any], output_path: str) -> bool:
+        """Save results to JSON file; returns False if saving failed.
+        
+        The file is written under a temporary name and renamed into place, so
+        an interrupted run never leaves a half-written results file behind.
+        """
+        # Unique per process and thread, as batch writer threads may share a directory
+        temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(output_path, 'w') as f:
+            with open(temp_path, 'w') as f:
                 json.dump(results, f, indent=2)
-            print(f"\nResults saved to: {output_path}")
+            os.replace(temp_path, output_path)
+            if self.verbose:
+                print(f"\nResults saved to: {output_path}")
+            return True
         except Exception as e:
             print(f"Error saving results: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+
+def serve_stdio(scorer: MultiModelMUSIQ, max_in_flight: int = 4, input_stream=None, output_stream=None):
+    """Answer JSONL scoring requests from stdin with one JSON result per line on stdout.
+    
+    A request is {"id": any, "image": path} or {"id": any, "image_bytes":
+    base64, "name": optional file name}, optionally with "models": [subset].
+    The response is {"id", "image", "status": "success" | "failed",
+    "results"} or {"id", "status": "failed", "error"}. Up to
+    `max_in_flight` requests are scored concurrently; responses are written
+    in request order, each as soon as it and all earlier ones are done, and
+    reading stops while `max_in_flight` responses are pending.
+    Results are returned only, not saved as JSON files. Serving stops when
+    the output can no longer be written (e.g. the reading process exited).
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    slots = threading.Semaphore(max_in_flight)
+    pending = queue.Queue()
+    # Set when writing a response failed; no further requests are read
+    stopped = threading.Event()
+    
+    def handle(line: str) -> Dict[str, any]:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            models = request.get("models")
+            unknown = [model_name for model_name in models or [] if model_name not in scorer.model_sources]
+            if unknown:
+                raise ValueError(f"Unknown models: {', '.join(unknown)}")
+            if "image_bytes" in request:
+                name = request.get("name") or f"request-{request_id}"
+                image = ImageInput(base64.b64decode(request["image_bytes"]), name)
+            elif request.get("image"):
+                if not os.path.exists(request["image"]):
+                    raise ValueError(f"Image file not found: {request['image']}")
+                image = ImageInput.from_path(request["image"])
+            else:
+                raise ValueError('Request needs "image" or "image_bytes"')
+            results = scorer.run_all_models(image, models=models)
+            return {"id": request_id, "image": image.image_path, "status": "success", "results": results}
+        except Exception as e:
+            return {"id": request_id, "status": "failed", "error": str(e)}
+    
+    def write_responses():
+        while True:
+            future = pending.get()
+            if future is None:
+                return
+            response = future.result()
+            if not stopped.is_set():
+                try:
+                    output_stream.write(json.dumps(response) + '\n')
+                    output_stream.flush()
+                except (OSError, ValueError) as e:
+                    # BrokenPipeError, or the stream was closed
+                    print(f"Error writing response: {e}; stopping", file=sys.stderr)
+                    stopped.set()
+            # Released even after a failed write, so the reader is not left blocked
+            slots.release()
+    
+    writer = threading.Thread(target=write_responses, daemon=True)
+    writer.start()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for line in input_stream:
+            if not line.strip():
+                continue
+            slots.acquire()
+            if stopped.is_set():
+                slots.release()
+                break
+            pending.put(pool.submit(handle, line))
+        pending.put(None)
+        writer.join()
 
 
 def main():
     """Main CLI function."""
     parser = argparse.ArgumentParser(
-        description="Run all available MUSIQ models on an image and save results to JSON",
+        description="Run all available MUSIQ models on one or more images and save results to JSON",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   python run_all_musiq_models.py --image sample.jpg
   python run_all_musiq_models.py --image /path/to/image.jpg --output-dir /path/to/output/
   python run_all_musiq_models.py --image sample.jpg --models spaq ava vila
+  python run_all_musiq_models.py --image sample.jpg --offline
+  python run_all_musiq_models.py --image sample.jpg --models spaq koniq --prefer-local
+  python run_all_musiq_models.py --image sample.jpg --parallel-models
+  python run_all_musiq_models.py photo1.jpg photo2.jpg "D:/Photos/2025/**/*.jpg" --output-dir results/
+  python run_all_musiq_models.py --manifest images.txt --jsonl > scores.jsonl
+  find /photos -name "*.jpg" | python run_all_musiq_models.py --manifest - --jsonl
+  python run_all_musiq_models.py --serve-stdio --max-in-flight 4 < requests.jsonl
+
+Models are loaded once for all images. With --jsonl, one JSON record per
+image ({"image", "status", "output_path", "results"}) is written to stdout
+as it finishes and all other output goes to stderr.
+
+With --serve-stdio, the models are loaded once and JSON requests are read
+from stdin, one per line: {"id": 1, "image": "/path/a.jpg"} or
+{"id": 2, "image_bytes": "<base64>", "name": "b.jpg", "models": ["spaq", "vila"]}.
+One JSON result per line is written to stdout, in request order.
+
+With a scoring daemon running (python scoring_daemon.py), images are scored by
+the daemon's already loaded models when it serves the requested models (all of
+them without --models) and no loading options (--offline, --prefer-local,
+--parallel-models) are given; otherwise they are scored in-process.
 
 Available Models:
   MUSIQ Models (Image Quality):
@@ -496,87 +1196,96 @@ Available Models:
         """
     )
     
-    parser.add_argument('--image', required=True, help='Path to input image')
-    parser.add_argument('--output-dir', help='Output directory for JSON file (default: same as image directory)')
+    parser.add_argument('images', nargs='*', help='Image paths or glob patterns')
+    parser.add_argument('--image', nargs='+', default=[], help='Image paths or glob patterns')
+    parser.add_argument('--manifest', help='File with one image path per line ("-" reads stdin)')
+    parser.add_argument('--output-dir', help='Output directory for JSON files (default: same as each image directory)')
+    parser.add_argument('--jsonl', action='store_true',
+                       help='Write one JSON record per image to stdout (other output goes to stderr)')
     parser.add_argument('--models', nargs='+', 
-                       choices=['spaq', 'ava', 'koniq', 'paq2piq', 'vila'],
+                       choices=list(ALL_MODELS),
                        help='Specific models to run (default: all models)')
+    parser.add_argument('--offline', action='store_true',
+                       help='Do not contact TF Hub or Kaggle Hub; load cached artifacts or local checkpoints only')
+    parser.add_argument('--prefer-local', action='store_true',
+                       help='Try local checkpoints first (.npz checkpoints run natively with JAX)')
+    parser.add_argument('--parallel-models', action='store_true',
+                       help='Run the models of each image concurrently instead of one after another')
+    parser.add_argument('--serve-stdio', action='store_true',
+                       help='Worker mode: answer JSON requests from stdin with JSON results on stdout (one per line)')
+    parser.add_argument('--max-in-flight', type=int, default=4,
+                       help='With --serve-stdio: maximum number of requests being scored at once (default: 4)')
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='Score in-process even if a scoring daemon is running')
+    parser.add_argument('--daemon-port', type=int, default=DEFAULT_PORT,
+                       help=f'Port of the scoring daemon (default: {DEFAULT_PORT}, or MUSIQ_DAEMON_PORT)')
     
     args = parser.parse_args()
     
-    # Validate input image
-    if not os.path.exists(args.image):
-        print(f"Error: Image file not found: {args.image}")
-        sys.exit(1)
-    
-    # Determine output path
-    image_path = Path(args.image)
-    if args.output_dir:
-        output_dir = Path(args.output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = output_dir / f"{image_path.stem}.json"
-    else:
-        output_path = image_path.parent / f"{image_path.stem}.json"
-    
-    # Initialize multi-model scorer
-    scorer = MultiModelMUSIQ()
-    
-    # Load models
-    if args.models:
-        # Load specific models
-        print(f"Loading specified models: {', '.join(args.models)}")
-        for model_name in args.models:
-            scorer.load_model(model_name)
-    else:
-        # Load all models
-        print("Loading all available MUSIQ models...")
-        load_results = scorer.load_all_models()
-        
-        # Check if any models loaded successfully
-        if not any(load_results.values()):
-            print("Error: No models loaded successfully")
+    # stdout carries only JSON records in --jsonl and --serve-stdio modes
+    jsonl_stream = sys.stdout if args.jsonl or args.serve_stdio else None
+    with human_output(jsonl_stream is not None):
+        image_paths = []
+        if not args.serve_stdio:
+            image_paths = expand_image_args(args.image + args.images, args.manifest)
+            if not image_paths:
+                print("Error: No images given (use image paths, --image, or --manifest)")
+                sys.exit(1)
+        
+        # Validate input images
+        if len(image_paths) == 1 and not os.path.exists(image_paths[0]):
+            print(f"Error: Image file not found: {image_paths[0]}")
             sys.exit(1)
+        
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        
+        # Initialize multi-model scorer
+        scorer = MultiModelMUSIQ(offline=args.offline, prefer_local=args.prefer_local,
+                                 parallel_models=args.parallel_models)
+        
+        # Load models once for all images
+        if args.models:
+            # Load specific models
+            print(f"Loading specified models: {', '.join(args.models)}")
+            scorer.load_all_models(args.models)
+        else:
+            # Load all models
+            print("Loading all available MUSIQ models...")
+            load_results = scorer.load_all_models()
+            
+            # Check if any models loaded successfully
+            if not any(load_results.values()):
+                print("Error: No models loaded successfully")
+                sys.exit(1)
+        
+        if args.serve_stdio:
+            scorer.verbose = False
+            print(f"Serving JSON requests on stdin (up to {args.max_in_flight} in flight)")
+            serve_stdio(scorer, max(1, args.max_in_flight), output_stream=jsonl_stream)
+            sys.exit(0)
+        
+        # Skip images already processed with current versions, otherwise run
+        # (only stale models when results exist) and save; stream each outcome
+        failed = 0
+        for image_path in image_paths:
+            output_dir = args.output_dir or str(Path(image_path).parent)
+            if not os.path.exists(image_path):
+                record = {"image": image_path, "status": "failed", "error": "Image file not found"}
+            else:
+                try:
+                    status, output_path, results = scorer.score_to_file(image_path, output_dir)
+                    record = {"image": image_path, "status": status, "output_path": output_path, "results": results}
+                except Exception as e:
+                    record = {"image": image_path, "status": "failed", "error": str(e)}
+            if record["status"] == "failed":
+                failed += 1
+            report_result(record, jsonl_stream)
+        
+        if len(image_paths) > 1:
+            print(f"\nProcessed {len(image_paths)} images, {failed} failed")
     
-    # Check if already processed with current version
-    if scorer.is_already_processed(args.image, args.output_dir):
-        print(f"Skipping {args.image} - already processed with version {scorer.VERSION}")
-        sys.exit(0)
-    
-    # Run all models on the image
-    results = scorer.run_all_models(args.image)
-    
-    # Save results
-    scorer.save_results(results, str(output_path))
-    
-    # Print summary
-    print("\n" + "=" * 60)
-    print("SUMMARY")
-    print("=" * 60)
-    print(f"Image: {results['image_name']}")
-    print(f"Device: {results['device']}")
-    print(f"Models loaded: {results['summary']['total_models']}")
-    print(f"Successful predictions: {results['summary']['successful_predictions']}")
-    print(f"Failed predictions: {results['summary']['failed_predictions']}")
-    
-    if results['summary']['average_normalized_score'] is not None:
-        print(f"Average normalized score: {results['summary']['average_normalized_score']}")
-    
-    # Show advanced scoring if available
-    if 'advanced_scoring' in results['summary']:
-        advanced = results['summary']['advanced_scoring']
-        print(f"Weighted score: {advanced['weighted_score']}")
-        print(f"Median score: {advanced['median_score']}")
-        print(f"Final robust score: {advanced['final_robust_score']}")
-        if advanced['outlier_count'] > 0:
-            print(f"Outliers detected: {advanced['outliers_detected']}")
-    
-    if results['summary']['successful_predictions'] > 0:
-        print("\nScores:")
-        for model_name, model_result in results['models'].items():
-            if model_result['status'] == 'success':
-                print(f"  {model_name.upper()}: {model_result['score']} ({model_result['score_range']}) - Normalized: {model_result['normalized_score']}")
-    
-    sys.exit(0)
+    sys.exit(1 if failed else 0)
 
 
 if __name__ == "__main__":
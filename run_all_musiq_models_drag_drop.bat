@@ -2,6 +2,7 @@
 REM MUSIQ Multi-Model Drag-and-Drop Runner for Windows 11 + WSL2
 REM Runs all available MUSIQ models on an image and saves results to JSON
 REM Simply drag and drop an image file onto this script
+REM Start 'python scoring_daemon.py' in WSL first to keep the models loaded between images
 
 echo ========================================
 echo    MUSIQ Multi-Model Drag-and-Drop Runner
@@ -27,11 +28,15 @@ if "%~1"=="" (
     exit /b 1
 )
 
-REM Process each dropped file
+REM Collect the dropped files; all of them are scored in one invocation so
+REM the models are loaded only once
+set "WSL_ARGS="
+set "FILE_COUNT=0"
+
 :process_file
 set "FILE_PATH=%~1"
 
-echo Processing: %FILE_PATH%
+echo Adding: %FILE_PATH%
 
 REM Check if file exists
 if not exist "%FILE_PATH%" (
@@ -59,25 +64,32 @@ set "WSL_PATH=%WSL_PATH:G:\=/mnt/g/%"
 set "WSL_PATH=%WSL_PATH:H:\=/mnt/h/%"
 set "WSL_PATH=%WSL_PATH:\=/%"
 
-echo WSL path: %WSL_PATH%
-echo.
+set "WSL_ARGS=%WSL_ARGS% '%WSL_PATH%'"
+set /a FILE_COUNT+=1
+
+:next_file
+shift
+if not "%~1"=="" goto :process_file
 
-echo Starting MUSIQ multi-model inference...
+if "%FILE_COUNT%"=="0" (
+    echo No image files to process.
+    pause
+    exit /b 1
+)
+
+echo.
+echo Starting MUSIQ multi-model inference on %FILE_COUNT% image(s)...
 echo ========================================
 
-REM Run MUSIQ multi-model through WSL2
-wsl bash -c "source ~/.venvs/tf/bin/activate && cd /mnt/d/Projects/image-scoring && python run_all_musiq_models.py --image '%WSL_PATH%' --output-dir /mnt/d/Projects/image-scoring"
+REM Run MUSIQ multi-model through WSL2, loading the models once for all images
+wsl bash -c "source ~/.venvs/tf/bin/activate && cd /mnt/d/Projects/image-scoring && python run_all_musiq_models.py --image%WSL_ARGS% --output-dir /mnt/d/Projects/image-scoring"
 
 echo.
 echo ========================================
-echo Processing completed for: %FILE_PATH%
+echo Processing completed for %FILE_COUNT% image(s)
 echo ========================================
 echo.
 
-:next_file
-shift
-if not "%~1"=="" goto :process_file
-
 echo All files processed!
 echo.
 echo JSON results files have been saved in the source folder.
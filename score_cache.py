@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Persistent score cache keyed by a content hash of the encoded image bytes.
+
+A photo that is renamed, moved or copied into another export folder has the
+same bytes, so its per-model scores are served from the cache instead of
+running inference again. The cache has a size limit (number of images) and
+evicts the least recently used images first.
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    content_hash TEXT PRIMARY KEY,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS scores (
+    content_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (content_hash, model, model_version)
+);
+"""
+
+# Default size limit, in images
+DEFAULT_MAX_ENTRIES = 1000000
+
+
+def content_hash(image_bytes: bytes) -> str:
+    """Fast content hash of the encoded image bytes."""
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+
+class ScoreCache:
+    """LRU-bounded SQLite cache of raw per-model scores keyed by content hash."""
+    
+    def __init__(self, db_path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._entry_count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def get(self, image_hash: str, model_versions: Dict[str, str]) -> Dict[str, float]:
+        """Return the cached scores of `image_hash` for the requested {model: version} pairs.
+        
+        Models without a cached score for their current version are counted
+        as misses and left out of the returned dict.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, model_version, score FROM scores WHERE content_hash = ?", (image_hash,)).fetchall()
+            found = {model: score for model, version, score in rows if model_versions.get(model) == version}
+            if found:
+                with self._conn:
+                    self._conn.execute("UPDATE entries SET last_used = ? WHERE content_hash = ?",
+                                       (time.time(), image_hash))
+            self.hits += len(found)
+            self.misses += len(model_versions) - len(found)
+        return found
+    
+    def put(self, image_hash: str, scores: Dict[str, float], model_versions: Dict[str, str]):
+        """Store raw scores for an image, evicting least recently used images if over the limit."""
+        if not scores:
+            return
+        with self._lock:
+            with self._conn:
+                is_new = self._conn.execute(
+                    "SELECT 1 FROM entries WHERE content_hash = ?", (image_hash,)).fetchone() is None
+                self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?)", (image_hash, time.time()))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                    [(image_hash, model, model_versions[model], score) for model, score in scores.items()])
+                if is_new:
+                    self._entry_count += 1
+                if self._entry_count > self.max_entries:
+                    # Other worker processes may share the file, so recount
+                    # before evicting
+                    self._entry_count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                    self._evict(self._entry_count - self.max_entries)
+    
+    def trim(self, max_entries: int) -> int:
+        """Evict least recently used images until at most `max_entries` remain; returns the count evicted."""
+        with self._lock:
+            with self._conn:
+                return self._evict(self._entry_count - max_entries)
+    
+    def _evict(self, count: int) -> int:
+        """Drop the `count` least recently used images (caller holds the lock and transaction)."""
+        if count <= 0:
+            return 0
+        victims = [(row[0],) for row in self._conn.execute(
+            "SELECT content_hash FROM entries ORDER BY last_used LIMIT ?", (count,))]
+        self._conn.executemany("DELETE FROM scores WHERE content_hash = ?", victims)
+        self._conn.executemany("DELETE FROM entries WHERE content_hash = ?", victims)
+        self._entry_count -= len(victims)
+        self.evictions += len(victims)
+        return len(victims)
+    
+    def stats(self) -> Dict[str, any]:
+        """Return hit/miss/eviction counters for this process and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "entries": self._entry_count,
+            "max_entries": self.max_entries
+        }
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Inspect or trim a MUSIQ content-hash score cache",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python score_cache.py --db score_cache.sqlite
+  python score_cache.py --db score_cache.sqlite --max-entries 100000
+        """
+    )
+    
+    parser.add_argument('--db', required=True, help='Path to the SQLite score cache')
+    parser.add_argument('--max-entries', type=int, help='Evict least recently used images down to this many')
+    
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db):
+        print(f"Error: Score cache not found: {args.db}")
+        sys.exit(1)
+    
+    cache = ScoreCache(args.db)
+    print(f"Cached images: {cache.stats()['entries']}")
+    
+    if args.max_entries is not None:
+        evicted = cache.trim(args.max_entries)
+        print(f"Evicted {evicted} images, {cache.stats()['entries']} remain")
+    
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Long-lived local scoring daemon for MultiModelMUSIQ.
+
+Importing TensorFlow and loading the five models takes tens of seconds, while
+scoring one image takes a fraction of that. The daemon loads the models once
+and serves scoring requests over HTTP on localhost, so the per-image CLI
+(run_all_musiq_models.py) and the drag-drop wrappers only send image paths.
+
+The client side in this module only uses the standard library, so a thin
+client can reach a running daemon without importing TensorFlow at all, and
+falls back to in-process scoring when no daemon is listening.
+
+Protocol (JSON over HTTP, 127.0.0.1 only):
+  GET  /health  -> {"status": "ok", "pid", "version", "models": [...]}
+  POST /score   {"image": path, "output_dir": dir, "models": [...] or null}
+                -> {"image", "status": "scored" | "skipped", "output_path", "results"}
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from image_scanner import expand_image_args
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("MUSIQ_DAEMON_PORT", "8765"))
+
+# Connecting to a daemon that is not running must fail fast; scoring (with
+# lazily loaded models or first-call tracing) may legitimately take long
+CONNECT_TIMEOUT = 1.0
+REQUEST_TIMEOUT = 600.0
+
+# Models an in-process run scores when no --models are given
+ALL_MODELS = ("spaq", "ava", "koniq", "paq2piq", "vila")
+
+
+class DaemonClient:
+    """Minimal HTTP client for a running scoring daemon."""
+    
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.host = host
+        self.port = port
+    
+    def _request(self, method: str, path: str, payload: Optional[dict] = None) -> Dict[str, any]:
+        """Send one request and return the decoded JSON response; raises OSError if unreachable."""
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT)
+        try:
+            connection.connect()
+            connection.sock.settimeout(REQUEST_TIMEOUT)
+            body = json.dumps(payload).encode('utf-8') if payload is not None else None
+            connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            data = json.loads(response.read().decode('utf-8'))
+            if response.status != 200:
+                raise RuntimeError(data.get("error", f"HTTP {response.status}"))
+            return data
+        finally:
+            connection.close()
+    
+    def health(self) -> Optional[Dict[str, any]]:
+        """Return the daemon's health record, or None if no daemon is listening."""
+        try:
+            return self._request("GET", "/health")
+        except (OSError, ValueError, RuntimeError):
+            return None
+    
+    def score(self, image_path: str, output_dir: str, models: Optional[List[str]] = None) -> Dict[str, any]:
+        """Score one image and save its JSON results in `output_dir`; paths are made absolute."""
+        return self._request("POST", "/score", {
+            "image": os.path.abspath(image_path),
+            "output_dir": os.path.abspath(output_dir),
+            "models": models
+        })
+
+
+def print_summary(results: Dict[str, any]):
+    """Print the per-image summary shown by run_all_musiq_models.py."""
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"Image: {results['image_name']}")
+    print(f"Device: {results['device']}")
+    print(f"Models loaded: {results['summary']['total_models']}")
+    print(f"Successful predictions: {results['summary']['successful_predictions']}")
+    print(f"Failed predictions: {results['summary']['failed_predictions']}")
+    print(f"Read time: {results['timing']['read_seconds']}s, inference time: {results['timing']['inference_seconds']}s")
+    
+    if results['summary']['average_normalized_score'] is not None:
+        print(f"Average normalized score: {results['summary']['average_normalized_score']}")
+    
+    # Show advanced scoring if available
+    if 'advanced_scoring' in results['summary']:
+        advanced = results['summary']['advanced_scoring']
+        print(f"Weighted score: {advanced['weighted_score']}")
+        print(f"Median score: {advanced['median_score']}")
+        print(f"Final robust score: {advanced['final_robust_score']}")
+        if advanced['outlier_count'] > 0:
+            print(f"Outliers detected: {advanced['outliers_detected']}")
+    
+    if results['summary']['successful_predictions'] > 0:
+        print("\nScores:")
+        for model_name, model_result in results['models'].items():
+            if model_result['status'] == 'success':
+                print(f"  {model_name.upper()}: {model_result['score']} ({model_result['score_range']}) - Normalized: {model_result['normalized_score']}")
+
+
+def report_result(record: Dict[str, any], jsonl_stream=None):
+    """Report one image: its JSON line on `jsonl_stream` (if given) and the human-readable summary.
+    
+    `record` is {"image", "status": "scored" | "skipped" | "failed",
+    "output_path", "results"} (or "error" for failed images).
+    """
+    if jsonl_stream is not None:
+        jsonl_stream.write(json.dumps(record) + '\n')
+        jsonl_stream.flush()
+    
+    if record["status"] == "failed":
+        print(f"Error: {record['image']}: {record['error']}")
+    elif record["status"] == "skipped":
+        print(f"Skipping {record['image']} - already processed with current versions")
+    else:
+        print(f"\nResults saved to: {record['output_path']}")
+        print_summary(record["results"])
+
+
+def human_output(jsonl: bool):
+    """Context for human-readable output: stderr when stdout carries JSONL records."""
+    return contextlib.redirect_stdout(sys.stderr) if jsonl else contextlib.nullcontext()
+
+
+def run_client(argv: List[str]) -> Optional[int]:
+    """Thin client for run_all_musiq_models.py: score through a running daemon.
+    
+    Returns the exit code when the daemon handled the request, or None when
+    the caller should score in-process (no daemon, --no-daemon, --serve-stdio, --help,
+    model loading options, no images, a model set the daemon does not serve, or a daemon
+    error). Without --models the daemon must serve all models.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--image', nargs='+', default=[])
+    parser.add_argument('--manifest')
+    parser.add_argument('--output-dir')
+    parser.add_argument('--models', nargs='+')
+    parser.add_argument('--jsonl', action='store_true')
+    parser.add_argument('--no-daemon', action='store_true')
+    parser.add_argument('--serve-stdio', action='store_true')
+    # The daemon loaded its models with its own options, so runs that set
+    # model loading options are scored in-process
+    parser.add_argument('--offline', action='store_true')
+    parser.add_argument('--prefer-local', action='store_true')
+    parser.add_argument('--parallel-models', action='store_true')
+    parser.add_argument('--daemon-port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('-h', '--help', action='store_true')
+    args, _ = parser.parse_known_args(argv)
+    
+    loading_options = args.offline or args.prefer_local or args.parallel_models
+    if args.no_daemon or args.serve_stdio or args.help or loading_options:
+        return None
+    
+    client = DaemonClient(port=args.daemon_port)
+    health = client.health()
+    if health is None:
+        return None
+    
+    jsonl_stream = sys.stdout if args.jsonl else None
+    with human_output(args.jsonl):
+        if sorted(args.models or ALL_MODELS) != sorted(health["models"]):
+            print(f"Scoring daemon serves {', '.join(health['models'])}; scoring in-process instead")
+            return None
+        
+        image_paths = expand_image_args(args.image + args.images, args.manifest)
+        if not image_paths:
+            return None
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        
+        print(f"Scoring {len(image_paths)} image(s) through daemon on port {args.daemon_port} (pid {health['pid']})")
+        failed = 0
+        for image_path in image_paths:
+            if not os.path.exists(image_path):
+                record = {"image": image_path, "status": "failed", "error": "Image file not found"}
+            else:
+                try:
+                    record = client.score(image_path, args.output_dir or str(Path(image_path).parent), args.models)
+                except RuntimeError as e:
+                    record = {"image": image_path, "status": "failed", "error": str(e)}
+                except (OSError, ValueError) as e:
+                    # Daemon gone; images already scored are skipped in-process
+                    print(f"Scoring daemon failed: {e}; scoring in-process instead")
+                    return None
+                record = dict(record, image=image_path)
+            if record["status"] == "failed":
+                failed += 1
+            report_result(record, jsonl_stream)
+        
+        if len(image_paths) > 1:
+            print(f"\nProcessed {len(image_paths)} images, {failed} failed")
+    
+    return 1 if failed else 0
+
+
+class ScoringDaemon:
+    """Loaded MultiModelMUSIQ scorer behind a localhost HTTP server."""
+    
+    def __init__(self, scorer, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.scorer = scorer
+        self.host = host
+        self.port = port
+        # One scoring request at a time: the models share one device and
+        # requests on the same output file must not interleave
+        self._lock = threading.Lock()
+        self.requests_served = 0
+    
+    def available_models(self) -> List[str]:
+        """Models loaded (or loaded on first use) by the daemon's scorer."""
+        return [name for name in self.scorer.model_sources if self.scorer.is_available(name)]
+    
+    def health(self) -> Dict[str, any]:
+        """Health record returned by GET /health."""
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "version": self.scorer.VERSION,
+            "models": self.available_models(),
+            "requests_served": self.requests_served
+        }
+    
+    def score(self, request: Dict[str, any]) -> Dict[str, any]:
+        """Handle POST /score: score one image and save its JSON results, like the one-image CLI."""
+        image_path = request.get("image")
+        if not image_path or not os.path.exists(image_path):
+            raise ValueError(f"Image file not found: {image_path}")
+        models = request.get("models")
+        if models and sorted(models) != sorted(self.available_models()):
+            raise ValueError(f"Daemon serves {', '.join(self.available_models())}, not {', '.join(models)}")
+        
+        output_dir = request.get("output_dir") or str(Path(image_path).parent)
+        with self._lock:
+            status, output_path, results = self.scorer.score_to_file(image_path, output_dir)
+            self.requests_served += 1
+        return {"image": image_path, "status": status, "output_path": output_path, "results": results}
+    
+    def serve_forever(self):
+        """Serve requests until interrupted."""
+        daemon = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, payload: Dict[str, any]):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_GET(self):
+                if self.path == "/health":
+                    self._reply(200, daemon.health())
+                else:
+                    self._reply(404, {"error": f"Unknown path: {self.path}"})
+            
+            def do_POST(self):
+                if self.path != "/score":
+                    self._reply(404, {"error": f"Unknown path: {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length).decode('utf-8'))
+                    self._reply(200, daemon.score(request))
+                except ValueError as e:
+                    self._reply(400, {"error": str(e)})
+                except Exception as e:
+                    self._reply(500, {"error": f"Scoring failed: {e}"})
+            
+            def log_message(self, format, *args):
+                # One line per request instead of the default stderr access log
+                print(f"[daemon] {self.address_string()} {format % args}")
+        
+        server = ThreadingHTTPServer((self.host, self.port), Handler)
+        print(f"Scoring daemon listening on http://{self.host}:{self.port} (pid {os.getpid()})")
+        print(f"Models: {', '.join(self.available_models())}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nScoring daemon stopped")
+        finally:
+            server.server_close()
+
+
+def main():
+    """Main CLI function."""
+    parser = argparse.ArgumentParser(
+        description="Keep MUSIQ/VILA models loaded and score images sent by run_all_musiq_models.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scoring_daemon.py
+  python scoring_daemon.py --models spaq koniq vila --port 8766
+  python scoring_daemon.py --status
+
+Then, in another terminal (falls back to in-process scoring without a daemon):
+  python run_all_musiq_models.py --image sample.jpg
+        """
+    )
+    
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'Port to listen on (default: {DEFAULT_PORT}, or MUSIQ_DAEMON_PORT)')
+    parser.add_argument('--models', nargs='+',
+                       choices=['spaq', 'ava', 'koniq', 'paq2piq', 'vila'],
+                       help='Models to serve (default: all models)')
+    parser.add_argument('--offline', action='store_true',
+                       help='Do not contact TF Hub or Kaggle Hub; load cached artifacts or local checkpoints only')
+    parser.add_argument('--prefer-local', action='store_true',
+                       help='Try local checkpoints first (.npz checkpoints run natively with JAX)')
+    parser.add_argument('--parallel-models', action='store_true',
+                       help='Run the models of each image concurrently instead of one after another')
+    parser.add_argument('--lazy-load', action='store_true',
+                       help='Load each model the first time a request needs it instead of at startup')
+    parser.add_argument('--status', action='store_true', help='Report whether a daemon is running and exit')
+    
+    args = parser.parse_args()
+    
+    if args.status:
+        health = DaemonClient(args.host, args.port).health()
+        if health is None:
+            print(f"No scoring daemon on {args.host}:{args.port}")
+            sys.exit(1)
+        print(json.dumps(health, indent=2))
+        sys.exit(0)
+    
+    # Imported here so the client side never pays for TensorFlow
+    from run_all_musiq_models import MultiModelMUSIQ
+    
+    scorer = MultiModelMUSIQ(offline=args.offline, prefer_local=args.prefer_local,
+                             parallel_models=args.parallel_models)
+    if args.lazy_load:
+        scorer.defer_models(args.models)
+    else:
+        load_results = scorer.load_all_models(args.models)
+        if not any(load_results.values()):
+            print("Error: No models loaded successfully")
+            sys.exit(1)
+    
+    ScoringDaemon(scorer, args.host, args.port).serve_forever()
+
+
+if __name__ == "__main__":
+    main()